@@ -6,7 +6,7 @@ import asyncio
 import datetime
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.core import HomeAssistant, State, SupportsResponse, callback
 from homeassistant.const import (
     CONF_HOST,
     EVENT_HOMEASSISTANT_STOP,
@@ -26,8 +26,11 @@ from homeassistant.helpers.service import async_register_admin_service
 
 from .core.const import *
 from .core.gateway import ProGateway
-from .core.device import XDevice, GatewayDevice, WifiPanelDevice
+from .core.device import XDevice
 from .core.converters.base import Converter
+from .core.scheduler import PRIORITY_POLL
+from .core.recorder import TrafficReplayer
+from .core.profiler import HotPathProfiler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -60,14 +63,10 @@ def init_integration_data(hass):
 async def async_setup(hass: HomeAssistant, hass_config: dict):
     init_integration_data(hass)
 
-    gws = hass_config.get(DOMAIN, {}).get(CONF_GATEWAYS) or []
-    for gwc in gws:
-        host = gwc.get(CONF_HOST)
-        if not host:
-            continue
+    async def setup_gateway(gwc):
         gtw = await get_gateway_from_config(hass, gwc)
         gwc['gateway'] = gtw
-        hass.data[DOMAIN][CONF_GATEWAYS][host] = gtw
+        hass.data[DOMAIN][CONF_GATEWAYS][gwc[CONF_HOST]] = gtw
 
         await asyncio.gather(
             *[
@@ -75,7 +74,14 @@ async def async_setup(hass: HomeAssistant, hass_config: dict):
                 for domain in SUPPORTED_DOMAINS
             ]
         )
-        await gtw.start()
+        await gtw.start(wait=False)
+
+    gws = hass_config.get(DOMAIN, {}).get(CONF_GATEWAYS) or []
+    await asyncio.gather(*[
+        setup_gateway(gwc)
+        for gwc in gws
+        if gwc.get(CONF_HOST)
+    ])
 
     ComponentServices(hass)
     return True
@@ -85,8 +91,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     init_integration_data(hass)
     await hass.config_entries.async_forward_entry_setups(entry, SUPPORTED_DOMAINS)
 
-    if gtw := await get_gateway_from_config(hass, entry):
-        await gtw.start()
+    if not (gtw := await get_gateway_from_config(hass, entry)):
+        return False
+    await gtw.start(wait=False)
 
     entry.async_on_unload(
         hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, gtw.stop)
@@ -147,6 +154,14 @@ async def async_reload_integration_config(hass, config):
     return config
 
 
+LIGHT_FRAME_SCHEMA = vol.Schema({
+    vol.Optional('light'): cv.boolean,
+    vol.Optional('brightness'): cv.byte,
+    vol.Optional('color_temp'): cv.positive_int,
+    vol.Optional('rgb_color'): vol.All(vol.ExactSequence((cv.byte, cv.byte, cv.byte)), vol.Coerce(tuple)),
+})
+
+
 class ComponentServices:
     def __init__(self, hass: HomeAssistant):
         self.hass = hass
@@ -165,6 +180,54 @@ class ComponentServices:
             }),
         )
 
+        hass.services.async_register(
+            DOMAIN, 'set_props', self.async_set_props,
+            schema=vol.Schema({
+                vol.Required('nodes'): vol.All(cv.ensure_list, [vol.Schema({
+                    vol.Optional('entity_id'): cv.entity_ids,
+                    vol.Optional('id'): vol.Coerce(int),
+                    vol.Required('attrs'): dict,
+                })]),
+            }),
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+        hass.services.async_register(
+            DOMAIN, 'light_stream', self.async_light_stream,
+            schema=vol.Schema({
+                vol.Required('entity_id'): cv.entity_ids,
+                vol.Required('frames'): vol.All(cv.ensure_list, [vol.Any(LIGHT_FRAME_SCHEMA, [LIGHT_FRAME_SCHEMA])]),
+                vol.Optional('fps', default=20): vol.All(vol.Coerce(float), vol.Range(min=1, max=30)),
+            }),
+        )
+
+        async_register_admin_service(
+            hass, DOMAIN, 'record_traffic', self.async_record_traffic,
+            schema=vol.Schema({
+                vol.Optional(CONF_HOST): cv.string,
+                vol.Optional('enabled', default=True): cv.boolean,
+                vol.Optional('path'): cv.string,
+            }),
+        )
+
+        async_register_admin_service(
+            hass, DOMAIN, 'replay_traffic', self.async_replay_traffic,
+            schema=vol.Schema({
+                vol.Optional(CONF_HOST): cv.string,
+                vol.Required('path'): cv.string,
+                vol.Optional('speed', default=1): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            }),
+        )
+
+        async_register_admin_service(
+            hass, DOMAIN, 'profile', self.async_profile,
+            schema=vol.Schema({
+                vol.Optional('duration', default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+                vol.Optional('sample', default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional('cprofile', default=False): cv.boolean,
+            }),
+        )
+
         hass.services.async_register(
             DOMAIN, 'mock_incoming_message', self.async_mock_incoming_message,
             schema=vol.Schema({
@@ -187,22 +250,54 @@ class ComponentServices:
         await asyncio.gather(*reload_tasks)
         await async_reload_integration_platforms(self.hass, DOMAIN, SUPPORTED_DOMAINS)
 
+    def gateways(self):
+        return [
+            g for g in self.hass.data[DOMAIN][CONF_GATEWAYS].values()
+            if isinstance(g, ProGateway)
+        ]
+
+    def get_gateway(self, host=None):
+        for gtw in self.gateways():
+            if gtw.host == host or not host:
+                return gtw
+        return None
+
+    def entity_devices(self):
+        """Index of entity_id => device across gateways."""
+        entities = {}
+        for gtw in self.gateways():
+            for dvc in gtw.devices.values():
+                for ent in dvc.entities.values():
+                    entities.setdefault(ent.entity_id, dvc)
+        return entities
+
+    def find_devices(self, entity_ids=None, nid=None, domain=None, entities=None):
+        """Return [device, entity_id] pairs in the order of entity_ids, reusing the entities index if given."""
+        dls = []
+        if nid is not None:
+            for gtw in self.gateways():
+                if dvc := gtw.devices.get(nid):
+                    dls.append([dvc, None])
+        if entity_ids and entities is None:
+            entities = self.entity_devices()
+        for eid in entity_ids or []:
+            if not (dvc := entities.get(eid)):
+                continue
+            if domain and not eid.startswith(f'{domain}.'):
+                _LOGGER.warning('Entity %s is not a %s', eid, domain)
+                continue
+            dls.append([dvc, eid])
+        return dls
+
     async def async_send_command(self, call):
         dat = call.data or {}
         gip = dat.get(CONF_HOST)
-        gtw = None
-        for g in self.hass.data[DOMAIN][CONF_GATEWAYS].values():
-            if not isinstance(gtw, ProGateway):
-                continue
-            if g.host == gip or not gip:
-                gtw = g
-                break
-        if not gtw:
+        if not (gtw := self.get_gateway(gip)):
             _LOGGER.warning('Gateway %s not found.', gip)
             return False
         method = dat['method']
         params = dat.get('params')
-        rdt = await gtw.send(method, params=params, wait_result=True)
+        rdt = await gtw.send(method, params=params, wait_result=True, priority=PRIORITY_POLL)
         if dat.get('throw', True):
             persistent_notification.async_create(
                 self.hass, f'{rdt}', 'Yeelight Pro command result', f'{DOMAIN}-debug',
@@ -215,17 +310,133 @@ class ComponentServices:
         })
         return rdt
 
+    async def async_set_props(self, call):
+        """Encode attrs of many devices and send one frame per gateway."""
+        batches = {}
+        results = []
+        entities = self.entity_devices()
+        for item in call.data['nodes']:
+            dls = self.find_devices(item.get('entity_id'), item.get('id'), entities=entities)
+            if not dls:
+                _LOGGER.warning('Devices not found: %s', item)
+            for dvc, eid in dls:
+                payload = dvc.encode(item['attrs'])
+                if not payload or not dvc.gateway:
+                    results.append({'id': dvc.id, 'entity_id': eid, 'result': None})
+                    continue
+                nodes = batches.setdefault((dvc.gateway, dvc.set_method), {})
+                node = nodes.setdefault(dvc.id, dvc.prop_node())
+                node.setdefault('set', {}).update(payload.pop('set', {}))
+                node.update(payload)
+                results.append({'id': dvc.id, 'entity_id': eid})
+
+        acks = {}
+        coros = [
+            gtw.set_props(list(nodes.values()), method=method)
+            for (gtw, method), nodes in batches.items()
+        ]
+        for (gtw, method), res in zip(batches, await asyncio.gather(*coros)):
+            for nid in batches[(gtw, method)]:
+                acks[nid] = res
+        for ret in results:
+            if 'result' in ret:
+                continue
+            res = acks.get(ret['id'])
+            for node in (res or {}).get('nodes') or []:
+                if node.get('id') == ret['id']:
+                    res = node
+                    break
+            ret['result'] = res
+        return {'results': results}
+
+    async def async_light_stream(self, call):
+        """Play frames on lights, a frame is attrs for all lights or a list of attrs in entity order."""
+        dat = call.data
+        fps = dat['fps']
+        lights = []
+        streams = {}
+        for dvc, _ in self.find_devices(dat['entity_id'], domain='light'):
+            if not (gtw := dvc.gateway):
+                continue
+            if gtw not in streams:
+                streams[gtw] = gtw.light_stream(fps)
+            lights.append([dvc, streams[gtw]])
+        if not lights:
+            _LOGGER.warning('Lights not found: %s', dat['entity_id'])
+            return False
+        for stream in streams.values():
+            stream.start()
+        try:
+            for frame in dat['frames']:
+                for i, (dvc, stream) in enumerate(lights):
+                    attrs = frame[i % len(frame)] if isinstance(frame, list) else frame
+                    stream.push(dvc, attrs)
+                await asyncio.sleep(1 / fps)
+        finally:
+            await asyncio.gather(*[s.stop() for s in streams.values()])
+        return True
+
+    async def async_record_traffic(self, call):
+        dat = call.data or {}
+        gip = dat.get(CONF_HOST)
+        if not (gtw := self.get_gateway(gip)):
+            _LOGGER.warning('Gateway %s not found.', gip)
+            return False
+        if not dat['enabled']:
+            if recorder := await self.hass.async_add_executor_job(gtw.stop_recording):
+                persistent_notification.async_create(
+                    self.hass, f'{recorder.count} frames saved to {recorder.path}',
+                    'Yeelight Pro traffic recorder', f'{DOMAIN}-debug',
+                )
+            return True
+        if not (path := dat.get('path')):
+            now = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            path = f'{DOMAIN}-{gtw.host}-{now}.rec.gz'
+        # relative to the config directory, like replay_traffic
+        path = self.hass.config.path(path)
+        await self.hass.async_add_executor_job(gtw.start_recording, path)
+        return True
+
+    async def async_replay_traffic(self, call):
+        dat = call.data or {}
+        gip = dat.get(CONF_HOST)
+        if not (gtw := self.get_gateway(gip)):
+            _LOGGER.warning('Gateway %s not found.', gip)
+            return False
+        replayer = TrafficReplayer(self.hass.config.path(dat['path']))
+        await self.hass.async_add_executor_job(replayer.load)
+        res = await replayer.replay(gtw, dat['speed'])
+        persistent_notification.async_create(
+            self.hass, f'{res}', 'Yeelight Pro traffic replay', f'{DOMAIN}-debug',
+        )
+        return True
+
+    async def async_profile(self, call):
+        """Time hot paths for a while and write the report to the config directory."""
+        dat = call.data or {}
+        if HotPathProfiler.active:
+            _LOGGER.warning('Profiler is already running.')
+            return False
+        entities = [(XEntity, 'async_set_state')]
+        profiler = HotPathProfiler(entities, sample=dat['sample'], cprofile=dat['cprofile'])
+        profiler.start()
+        try:
+            await asyncio.sleep(dat['duration'])
+        finally:
+            profiler.stop()
+        now = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+        path = self.hass.config.path(f'{DOMAIN}-profile-{now}.txt')
+        stats_path = self.hass.config.path(f'{DOMAIN}-profile-{now}.prof')
+        await self.hass.async_add_executor_job(profiler.save, path, stats_path)
+        persistent_notification.async_create(
+            self.hass, f'Report saved to {path}', 'Yeelight Pro profiler', f'{DOMAIN}-debug',
+        )
+        return True
+
     async def async_mock_incoming_message(self, call):
         dat = call.data or {}
         gip = dat.get(CONF_HOST)
-        gtw = None
-        for g in self.hass.data[DOMAIN][CONF_GATEWAYS].values():
-            if not isinstance(g, ProGateway):
-                continue
-            if g.host == gip or not gip:
-                gtw = g
-                break
-        if not gtw:
+        if not (gtw := self.get_gateway(gip)):
             _LOGGER.warning('Gateway %s not found.', gip)
             return False
         message = dat['message']
@@ -270,23 +481,19 @@ class XEntity(Entity):
         self._attr_native_unit_of_measurement = conv.unit_of_measurement
         self._attr_entity_category = self._option.get('category')
         self._attr_translation_key = self._option.get('translation_key', conv.attr)
-
-        via_device = None
-        if not isinstance(device, (GatewayDevice, WifiPanelDevice)):
-            via_device = (DOMAIN, device.gateway.device.id)
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, device.id)},
-            name=device.name,
-            model=device.pid or device.type or '',
-            via_device=via_device,
-            sw_version=device.firmware_version,
-            manufacturer=DEFAULT_NAME,
-        )
         self._attr_extra_state_attributes = {}
         self._vars = {}
         self.subscribed_attrs = device.subscribe_attrs(conv)
         device.entities[conv.attr] = self
 
+    @property
+    def device_info(self) -> DeviceInfo:
+        return self.device.device_info
+
+    @property
+    def available(self):
+        return self.device.available
+
     async def async_added_to_hass(self):
         """Run when entity about to be added to hass."""
         if hasattr(self, 'async_get_last_state'):
@@ -314,7 +521,4 @@ class XEntity(Entity):
         _LOGGER.info('%s: State changed: %s', self.entity_id, data)
 
     async def device_send_props(self, value: dict):
-        payload = self.device.encode(value)
-        if not payload:
-            return False
-        return await self.device.set_prop(**payload)
+        return await self.device.send_props(value)
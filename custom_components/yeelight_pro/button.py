@@ -13,6 +13,7 @@ from . import (
     async_add_setuper,
 )
 from .core.converters.base import SceneConv
+from .core.scheduler import PRIORITY_BATCH
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,9 +45,14 @@ class XButtonEntity(XEntity, ButtonEntity):
 class XSceneEntity(XButtonEntity):
     def __init__(self, device: XDevice, conv: SceneConv, option=None):
         super().__init__(device, conv, option)
+        self._conv = conv
         self._attr_id = conv.node.get('id')
-        self._attr_name = conv.node.get('n') or conv.attr
+
+    @property
+    def name(self):
+        """Scene name from the gateway metadata cache."""
+        return self._conv.node.get('n') or self._name
 
     async def async_press(self):
         """Press the button."""
-        await self.device.gateway.send('gateway_set.prop', scenes=[{'id': self._attr_id}])
+        await self.device.gateway.send('gateway_set.prop', scenes=[{'id': self._attr_id}], priority=PRIORITY_BATCH)
@@ -31,6 +31,8 @@ from . import (
 
 _LOGGER = logging.getLogger(__name__)
 
+CHANNEL_ATTRS = ('is_on', 'current_temperature', 'target_temperature', 'mode', 'fan_mode')
+
 
 def setuper(add_entities):
     def setup(device: XDevice, conv: Converter):
@@ -55,6 +57,11 @@ class XClimateEntity(XEntity, ClimateEntity, RestoreEntity):
         self.mode = None
         self.is_on = False
 
+        # attrs of multi-channel devices are suffixed by channel, e.g. `climate2` => `is_on2`
+        suffix = conv.attr[len(ENTITY_DOMAIN):]
+        self._channel_keys = {f'{k}{suffix}': k for k in CHANNEL_ATTRS}
+        self._device_keys = {k: f'{k}{suffix}' for k in CHANNEL_ATTRS}
+
         # https://developers.home-assistant.io/docs/core/entity/climate#supported-features
         self._attr_hvac_modes = [
             HVACMode.OFF,
@@ -82,9 +89,13 @@ class XClimateEntity(XEntity, ClimateEntity, RestoreEntity):
     @callback
     def async_set_state(self, data: dict):
         for k, v in data.items():
-            setattr(self, k, v)
+            if k := self._channel_keys.get(k):
+                setattr(self, k, v)
         self._attr_hvac_mode = self.mode if self.is_on else HVACMode.OFF
-        
+
+    async def device_send_props(self, value: dict):
+        keys = self._device_keys
+        return await super().device_send_props({keys.get(k, k): v for k, v in value.items()})
 
     @callback
     def async_restore_last_state(self, state: str, attrs: dict):
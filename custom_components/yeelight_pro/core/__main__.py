@@ -0,0 +1,158 @@
+"""Command line client, run from `custom_components/yeelight_pro`: `python -m core --help`."""
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+
+from .const import PID_GATEWAY, PID_WIFI_PANEL
+from .gateway import ProGateway
+from .simulator import GatewaySimulator, synthetic_nodes
+
+_LOGGER = logging.getLogger('yeelight_pro')
+
+
+class WatchGateway(ProGateway):
+    """Print decoded props and events of every frame."""
+
+    async def on_message(self, msg):
+        await super().on_message(msg)
+        dat = json.loads(msg.decode()) or {}
+        cmd = dat.get('method') or ''
+        if not cmd.endswith(('post.prop', 'post.event')):
+            return
+        for node in dat.get('nodes') or [dat.get('params') or {}]:
+            if not (dvc := self.devices.get(node.get('id'))):
+                continue
+            decoded = dvc.decode_event(node) if cmd.endswith('event') else dvc.decode(node)
+            print(json.dumps({
+                'time': round(time.time(), 3),
+                'id': dvc.id,
+                'name': dvc.name,
+                'method': cmd,
+                'decoded': decoded,
+            }, ensure_ascii=False, default=str), flush=True)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+async def dump(gtw: ProGateway, args):
+    cmd = 'device_get.topology' if gtw.pid == PID_WIFI_PANEL else 'gateway_get.topology'
+    topology, rooms, scenes = await asyncio.gather(
+        gtw.send(cmd),
+        gtw.get_room(),
+        gtw.get_scene(),
+    )
+    print(json.dumps({
+        'topology': (topology or {}).get('nodes'),
+        'rooms': (rooms or {}).get('rooms'),
+        'scenes': scenes,
+    }, indent=2, ensure_ascii=False))
+
+
+async def watch(gtw: ProGateway, args):
+    while True:
+        await asyncio.sleep(3600)
+
+
+async def bench(gtw: ProGateway, args):
+    props = json.loads(args.props)
+    nodes = args.node
+    if not nodes:
+        res = await gtw.send('gateway_get.topology')
+        nodes = [n['id'] for n in (res or {}).get('nodes') or [] if n.get('nt') == 2][:1]
+    if not nodes:
+        print('No node to bench', file=sys.stderr)
+        return
+    latencies = []
+    failed = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def command(i):
+        nonlocal failed
+        async with semaphore:
+            start = time.perf_counter()
+            node = {'id': nodes[i % len(nodes)], 'nt': 2, 'set': props}
+            if await gtw.send('gateway_set.prop', nodes=[node], retry=False) is None:
+                failed += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[command(i) for i in range(args.count)])
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'commands': args.count,
+        'acked': len(latencies),
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 1),
+        **{
+            f'p{p}_ms': round(percentile(latencies, p) * 1000, 1) if latencies else None
+            for p in (50, 95, 99)
+        },
+    }, indent=2))
+
+
+COMMANDS = {
+    'dump': dump,
+    'watch': watch,
+    'bench': bench,
+}
+
+
+async def main(args):
+    simulator = None
+    host, port = args.host, args.port
+    if args.simulator:
+        simulator = GatewaySimulator(synthetic_nodes(args.devices), latency=args.latency)
+        port = await simulator.start('127.0.0.1', 0)
+        host = '127.0.0.1'
+    if not host:
+        print('Gateway host or --simulator is required', file=sys.stderr)
+        return 2
+    cls = WatchGateway if args.command == 'watch' else ProGateway
+    gtw = cls(host, port=port, pid=args.pid, timeout=args.timeout, send_rate=args.rate, send_burst=args.rate)
+    try:
+        await gtw.start()
+        await COMMANDS[args.command](gtw, args)
+    finally:
+        await gtw.stop()
+        if simulator:
+            await simulator.stop()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m core', description='Yeelight Pro gateway client')
+    parser.add_argument('command', choices=list(COMMANDS))
+    parser.add_argument('host', nargs='?', help='Gateway host')
+    parser.add_argument('--port', type=int, default=ProGateway.port)
+    parser.add_argument('--pid', type=int, default=PID_GATEWAY, help='1: gateway, 2: wifi panel')
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--rate', type=float, default=20, help='Commands per second of the send scheduler')
+    parser.add_argument('--simulator', action='store_true', help='Connect to a local simulated gateway')
+    parser.add_argument('--devices', type=int, default=100, help='Devices of the simulator')
+    parser.add_argument('--latency', type=float, default=0.02, help='Reply latency of the simulator')
+    parser.add_argument('--node', type=int, action='append', help='Node ids of bench, default is the first device')
+    parser.add_argument('--props', default='{"p": true}', help='Props of bench commands (JSON)')
+    parser.add_argument('--count', type=int, default=100, help='Commands of bench')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent commands of bench')
+    parser.add_argument('-v', '--verbose', action='count', default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    _args = parse_args()
+    logging.basicConfig(level=[logging.WARNING, logging.INFO, logging.DEBUG][min(_args.verbose, 2)])
+    try:
+        sys.exit(asyncio.run(main(_args)))
+    except KeyboardInterrupt:
+        pass
@@ -13,6 +13,7 @@ SUPPORTED_DOMAINS = [
     'binary_sensor',
     'cover',
     'climate',
+    'event',
 ]
 
 PID_GATEWAY = 1
@@ -22,3 +23,24 @@ GATEWAY_TYPES = {
     PID_GATEWAY: 'Gateway Pro (网关)',
     PID_WIFI_PANEL: 'Wifi Panel (全面屏)',
 }
+
+# Values of hass enums used by the device library, core/ must not import homeassistant.
+# ColorMode, HVACMode and fan modes are str enums, so these compare equal to them.
+COLOR_MODE_ONOFF = 'onoff'
+COLOR_MODE_BRIGHTNESS = 'brightness'
+COLOR_MODE_COLOR_TEMP = 'color_temp'
+COLOR_MODE_RGB = 'rgb'
+
+HVAC_MODE_COOL = 'cool'
+HVAC_MODE_DRY = 'dry'
+HVAC_MODE_FAN_ONLY = 'fan_only'
+HVAC_MODE_HEAT = 'heat'
+
+FAN_LOW = 'low'
+FAN_MEDIUM = 'medium'
+FAN_HIGH = 'high'
+
+COVER_STATE_OPENING = 'opening'
+COVER_STATE_CLOSING = 'closing'
+COVER_STATE_OPEN = 'open'
+COVER_STATE_CLOSED = 'closed'
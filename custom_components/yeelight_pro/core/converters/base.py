@@ -1,5 +1,7 @@
+import sys
 from dataclasses import dataclass
-from typing import Any, Optional, Union, TYPE_CHECKING
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple, Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..device import XDevice
@@ -44,12 +46,21 @@ class BoolConv(Converter):
 class MapConv(Converter):
     map: dict = None
 
+    _rmap = None  # reverse map, built on first encode
+
+    @property
+    def rmap(self) -> dict:
+        if self._rmap is None:
+            self._rmap = {v: k for k, v in (self.map or {}).items()}
+        return self._rmap
+
     def decode(self, device: "XDevice", payload: dict, value: Union[str, int]):
         payload[self.attr] = self.map.get(value)
 
     def encode(self, device: "XDevice", payload: dict, value: Any):
-        value = next(k for k, v in self.map.items() if v == value)
-        super().encode(device, payload, value)
+        if value not in self.rmap:
+            raise ValueError(f"Unmapped value for {self.attr}: {value!r}, supported: {list(self.rmap)}")
+        super().encode(device, payload, self.rmap[value])
 
 
 @dataclass
@@ -128,52 +139,84 @@ class ColorRgbConv(PropConv):
         super().encode(device, payload, value)
 
 
+@lru_cache(maxsize=4096)
+def parse_channel_key(key: str) -> Optional[Tuple[int, str]]:
+    """Split prop key of a channel, e.g. "2-acp" => (2, "acp"), None for device level keys."""
+    channel, sep, field = key.partition("-")
+    if not sep or not channel.isdigit():
+        return None
+    return int(channel), sys.intern(field)
+
+
+BUTTON_EVENTS = ("panel.click", "panel.hold", "panel.release", "keyClick")
+BUTTON_COUNT_NAMES = {1: "single", 2: "double", 3: "triple"}
+KNOB_SPIN_KEYS = (
+    "free_spin",
+    "hold_spin",
+    *(f"{i}-free_spin" for i in range(1, 5)),  # For E-Series Knob Support
+)
+
+EVENT_DECODERS = {}
+
+
 @dataclass
 class EventConv(Converter):
     event: str = ""
 
-    def decode(self, device: "XDevice", payload: dict, value: dict):
-        key, val = self.attr, None
-        if "." in self.attr:
-            key, val = self.attr.split(".", 1)
+    def __post_init__(self):
+        # decoders are shared by all converters of the same event
+        if not (decoder := EVENT_DECODERS.get(self.attr)):
+            decoder = EVENT_DECODERS[self.attr] = self.compile()
+        self.decoder = decoder
+
+    def compile(self) -> Callable[[dict, dict], None]:
+        """Build the decoder of this event once, called with (payload, params)."""
+        attr = self.attr
+        key, val = attr, None
+        if "." in attr:
+            key, val = attr.split(".", 1)
+
         if key in ["motion", "contact"]:
-            payload.update(
-                {
-                    key: val in ["true", "open"],
-                    **value,
-                }
-            )
-        elif self.attr in ["panel.click", "panel.hold", "panel.release", "keyClick"]:
-            key = value.get("key", "")
-            cnt = value.get("count", None)
-            btn = f"button{key}"
-            if cnt is not None:
-                typ = {1: "single", 2: "double", 3: "triple"}.get(cnt, val)
-            else:
-                typ = val
-            if typ:
-                btn += f"_{typ}"
-            payload.update(
-                {
-                    "action": btn,
-                    "event": self.attr,
-                    "button": key,
-                    **value,
-                }
-            )
-        elif self.attr in ["knob.spin"]:
-            keys = ["free_spin", "hold_spin"]
-            keys += [f"{i}-free_spin" for i in range(1, 5)]  # For E-Series Knob Support
-            for typ in keys:
-                if value.get(typ) in [None, 0]:
-                    continue
-                payload.update(
-                    {
-                        "action": typ,
-                        "event": self.attr,
-                        **value,
-                    }
-                )
+            state = val in ["true", "open"]
+
+            def decode(payload: dict, value: dict):
+                payload[key] = state
+                payload.update(value)
+
+        elif attr in BUTTON_EVENTS:
+            suffixes = {cnt: f"_{typ}" for cnt, typ in BUTTON_COUNT_NAMES.items()}
+            default = f"_{val}" if val else ""
+
+            def decode(payload: dict, value: dict):
+                btn = value.get("key", "")
+                cnt = value.get("count", None)
+                suffix = default if cnt is None else suffixes.get(cnt, default)
+                payload["action"] = f"button{btn}{suffix}"
+                payload["event"] = attr
+                payload["button"] = btn
+                payload.update(value)
+
+        elif attr in ["knob.spin"]:
+            keys = KNOB_SPIN_KEYS[::-1]  # the last spinning key wins
+
+            def decode(payload: dict, value: dict):
+                for typ in keys:
+                    if value.get(typ) in [None, 0]:
+                        continue
+                    payload["action"] = typ
+                    payload["event"] = attr
+                    payload.update(value)
+                    break
+
+        else:
+
+            def decode(payload: dict, value: dict):
+                pass
+
+        return decode
+
+    def decode(self, device: "XDevice", payload: dict, value: dict):
+        self.decoder(payload, value)
 
     def encode(self, device: "XDevice", payload: dict, value: dict):
         super().encode(device, payload, value)
@@ -1,24 +1,20 @@
+import sys
+import time
 import asyncio
 import logging
 from enum import IntEnum
+from functools import partial
+from .const import *
 from .converters.base import *
+from .travel import TravelModel
 
-from typing import Dict, List, TYPE_CHECKING
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .. import XEntity
     from .gateway import ProGateway
     from homeassistant.core import HomeAssistant
 
-from homeassistant.components.light import ColorMode
-from homeassistant.components.climate import (
-    FAN_LOW,
-    FAN_MEDIUM,
-    FAN_HIGH,
-)
-from homeassistant.components.climate.const import (
-    HVACMode,
-)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -60,31 +56,172 @@ DEVICE_TYPE_LIGHTS = [
     DeviceType.LIGHT_WITH_COLOR,
     DeviceType.LIGHT_WITH_ZOOM_CT,
 ]
+DEVICE_TYPE_SWITCHES = [
+    DeviceType.RELAY_DOUBLE,
+    DeviceType.SWITCH_PANEL,
+]
+
+# converter layout => decode table, shared by devices of the same layout
+DECODE_TABLES: Dict[tuple, tuple] = {}
+# params keys seen by a device, shared by devices of the same keys
+KNOWN_KEYS: Dict[frozenset, frozenset] = {}
+
+CLIMATE_MODES = {
+    1: HVAC_MODE_COOL,
+    2: HVAC_MODE_DRY,
+    4: HVAC_MODE_FAN_ONLY,
+    8: HVAC_MODE_HEAT,
+}
+CLIMATE_FAN_MODES = {
+    1: FAN_HIGH,
+    2: FAN_MEDIUM,
+    4: FAN_LOW,
+}
+
+
+class DeviceCommander:
+    """One command in flight per device, newer values supersede pending values of the same attribute.
+
+    Writes queued while a command is in flight are sent as one `set` payload,
+    a `merge_window` of the gateway also holds the first write for that long (opt-in).
+    """
+
+    def __init__(self, device: "XDevice"):
+        self.device = device
+        self.pending: Dict[str, tuple] = {}  # attr => (value, caller future)
+        self.task: Optional[asyncio.Task] = None
+
+    async def send(self, value: dict):
+        fut = asyncio.get_running_loop().create_future()
+        superseded = set()
+        for k, v in value.items():
+            if old := self.pending.get(k):
+                superseded.add(old[1])
+            self.pending[k] = (v, fut)
+        waiting = {f for _, f in self.pending.values()}
+        for old in superseded - waiting:
+            # all attrs replaced by newer values, never hits the wire
+            if not old.done():
+                old.set_result(None)
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return await fut
+
+    async def run(self):
+        if window := getattr(self.device.gateway, 'merge_window', 0):
+            await asyncio.sleep(window)
+        while self.pending:
+            batch, self.pending = self.pending, {}
+            futs = {f for _, f in batch.values()}
+            try:
+                payload = self.device.encode({k: v for k, (v, _) in batch.items()})
+                res = await self.device.set_prop(**payload)
+            except Exception as exc:
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            for fut in futs:
+                if not fut.done():
+                    fut.set_result(res)
+
+
+def intern_keys(data: dict) -> dict:
+    return {sys.intern(k): v for k, v in data.items()}
 
 
 class XDevice:
-    hass: "HomeAssistant" = None
-    converters: Dict[str, Converter] = None
+    __slots__ = (
+        'id', 'nt', 'pid', 'type', '_name', 'cids', 'ch_num', 'prop', 'hass',
+        'entities', 'gateways', 'groups', 'converters',
+        '_encode_plan', '_event_table', '_decode_table', '_stream_state', '_commander', '_device_info',
+        '_channels', '_keys', '__weakref__',
+    )
+    hass: Optional["HomeAssistant"]
+    converters: Dict[str, Converter]
+    set_method = 'gateway_set.prop'
+    via_gateway = True
+    optional_keys = frozenset()  # params keys enabling an optional converter, see `key_converter`
+    channel_fields = frozenset()  # fields of `N-field` prop keys creating converters of channel N
+    default_channels = ()
+    single_channel_attr = True  # attrs without index when the device has only channel 1
 
     def __init__(self, node: dict):
+        self.hass = None
+        self._device_info = None
         self.id = int(node['id'])
         self.nt = node.get('nt', 0)
         self.pid = node.get('pid')
         self.type = node.get('type', 0)
-        self.name = node.get('n', '')
+        self._name = node.get('n', '')
         self.cids = node.get('cids')
         self.ch_num = node.get('ch_num')
         self.prop = {}
         self.entities: Dict[str, "XEntity"] = {}
         self.gateways: List["ProGateway"] = []
+        self.groups: List["GroupDevice"] = []
         self.converters = {}
+        self._encode_plan = None
+        self._event_table = None
+        self._decode_table = None
+        self._stream_state = None
+        self._commander = None
+        self._channels = None
+        self._keys = frozenset()
         self.setup_converters()
 
     def setup_converters(self):
-        pass
+        self.add_keys(self.prop_params)
 
     def add_converter(self, conv: Converter):
         self.converters[conv.attr] = conv
+        self._encode_plan = None
+        self._event_table = None
+        self._decode_table = None
+
+    def add_keys(self, keys) -> List[Converter]:
+        """Add converters enabled by new params keys, return the added ones."""
+        added = []
+        if self.optional_keys:
+            for key in self.optional_keys.intersection(keys):
+                if (conv := self.key_converter(key)) and conv.attr not in self.converters:
+                    self.add_converter(conv)
+                    added.append(conv)
+        if self.channel_fields:
+            added.extend(self.setup_channels(keys))
+        return added
+
+    def setup_channels(self, keys) -> List[Converter]:
+        """Add converters of channels first seen in prop keys, return the added ones."""
+        known = self._channels or ()
+        found = set()
+        if self._channels is None:
+            found.update(range(1, self.ch_num + 1) if self.ch_num else self.default_channels)
+        for key in keys:
+            if (parsed := parse_channel_key(key)) and parsed[1] in self.channel_fields:
+                found.add(parsed[0])
+        if not (found := found.difference(known)):
+            self._channels = known
+            return []
+        single = self.single_channel_attr and not known and found == {1}
+        self._channels = tuple(sorted({*known, *found}))
+        added = []
+        for channel in sorted(found):
+            for conv in self.channel_converters(channel, '' if single else channel):
+                if conv.attr not in self.converters:
+                    self.add_converter(conv)
+                    added.append(conv)
+        return added
+
+    def key_converter(self, key: str) -> Optional[Converter]:
+        return None
+
+    def channel_converters(self, channel: int, suffix) -> List[Converter]:
+        return []
+
+    @property
+    def channels(self):
+        return self._channels or ()
 
     def add_converters(self, *args: Converter):
         for conv in args:
@@ -92,19 +229,29 @@ class XDevice:
 
     @staticmethod
     async def from_node(gateway: "ProGateway", node: dict):
-        if node.get('nt') not in [NodeType.MESH, NodeType.MRSH_GROUP, NodeType.SCENE]:
+        if node.get('nt') not in [NodeType.MESH, NodeType.GROUP, NodeType.MRSH_GROUP, NodeType.SCENE]:
             return None
         if not (nid := node.get('id')):
             return None
         if dvc := gateway.devices.get(nid):
             if n := node.get('n'):
                 dvc.name = n
+            if isinstance(dvc, GroupDevice) and dvc.set_members(node):
+                gateway.link_group(dvc)
         else:
             dvc = XDevice(node)
             if dvc.nt in [NodeType.SCENE]:
                 if isinstance(gateway.device, GatewayDevice):
-                    await gateway.device.add_scene(node)
+                    await gateway.device.add_scenes([node])
                 return gateway.device
+            elif dvc.nt in [NodeType.GROUP, NodeType.MRSH_GROUP]:
+                if dvc.type in DEVICE_TYPE_LIGHTS:
+                    dvc = LightGroupDevice(node)
+                elif dvc.type in DEVICE_TYPE_SWITCHES:
+                    dvc = SwitchGroupDevice(node)
+                else:
+                    _LOGGER.info('Unsupported group: %s', node)
+                    return None
             elif dvc.type in DEVICE_TYPE_LIGHTS:
                 dvc = LightDevice(node)
             elif dvc.type in [DeviceType.SWITCH_PANEL]:
@@ -124,6 +271,8 @@ class XDevice:
                 dvc = CoverDevice(node)
             elif dvc.type in [DeviceType.AIR_CONDITIONER]:
                 dvc = ClimateDevice(node)
+            elif dvc.type in [DeviceType.VRF]:
+                dvc = VrfClimateDevice(node)
             else:
                 _LOGGER.warning('Unsupported device: %s', node)
                 return None
@@ -136,21 +285,35 @@ class XDevice:
     async def from_nodes(gateway: "ProGateway", nodes: List[dict]):
         dls = []
         for node in nodes:
-            if (dvc := XDevice.from_node(gateway, node)) is None:
+            if (dvc := await XDevice.from_node(gateway, node)) is None:
                 continue
             dls.append(dvc)
         return dls
 
     async def prop_changed(self, data: dict):
-        has_new = False
-        for k in data.keys():
-            if k not in self.prop:
-                has_new = True
-                break
-        self.prop.update(data)
-        if has_new:
-            self.setup_converters()
-            await self.setup_entities()
+        prop = self.prop
+        size = len(prop)
+        fv = prop.get('fv')
+        prop.update(data)
+        fresh = None
+        if 'params' in data:
+            changed = data['params'] or {}
+            if not changed.keys() <= (known := self._keys):
+                # diff against every key seen, devices may send one channel per frame
+                fresh = [k for k in changed if k not in known]
+                keys = known.union(fresh)
+                self._keys = KNOWN_KEYS.setdefault(keys, keys)
+            # params keys are shared by every device of the model
+            prop['params'] = intern_keys(changed)
+        if len(prop) != size:
+            # new keys are interned
+            self.prop = intern_keys(prop)
+        if self.prop.get('fv') != fv:
+            # read again by hass for entities added later
+            self._device_info = None
+        if fresh and (added := self.add_keys(fresh)):
+            # only capabilities of new keys, steady state props skip setup
+            await self.setup_entities(added)
         self.update(self.decode(data))
 
     async def event_fired(self, data: dict):
@@ -158,12 +321,51 @@ class XDevice:
         self.update(decoded)
         _LOGGER.debug('Event fired: %s', [data, decoded])
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if value != self._name:
+            self._name = value
+            self._device_info = None
+
+    @property
+    def device_info(self) -> dict:
+        """Hass device info shared by all entities of the device, rebuilt on name or firmware change."""
+        if self._device_info is not None:
+            return self._device_info
+        via_device = None
+        if self.via_gateway:
+            if not (gateway := self.gateway) or not gateway.device:
+                return {'identifiers': {(DOMAIN, self.id)}}
+            via_device = (DOMAIN, gateway.device.id)
+        self._device_info = {
+            'identifiers': {(DOMAIN, self.id)},
+            'name': self.name,
+            'model': self.pid or self.type or '',
+            'via_device': via_device,
+            'sw_version': self.firmware_version,
+            'manufacturer': DEFAULT_NAME,
+        }
+        return self._device_info
+
     @property
     def gateway(self):
         if self.gateways:
             return self.gateways[0]
         return None
 
+    @property
+    def available(self):
+        return any(gtw.available for gtw in self.gateways)
+
+    def availability_changed(self):
+        for entity in self.entities.values():
+            if entity.added:
+                entity.async_write_ha_state()
+
     @property
     def online(self):
         return self.prop.get('o')
@@ -183,18 +385,20 @@ class XDevice:
     def entity_id(self, conv: Converter):
         return f'{conv.domain}.yp{self.unique_id}_{conv.attr}'
 
-    async def setup_entities(self):
+    async def setup_entities(self, convs: Optional[List[Converter]] = None):
+        """Setup entities of all converters, or of the given new ones."""
         if not (gateway := self.gateway):
             return
-        if not self.converters:
-            _LOGGER.warning('Device has none converters: %s', [type(self), self.id])
-        for conv in self.converters.values():
+        if convs is None:
+            if not self.converters:
+                _LOGGER.warning('Device has none converters: %s', [type(self), self.id])
+            convs = list(self.converters.values())
+        for conv in convs:
             domain = conv.domain
             if domain is None:
                 continue
             if conv.attr in self.entities:
                 continue
-            await asyncio.sleep(1)  # wait for setup
             await gateway.setup_entity(domain, self, conv)
 
     def subscribe_attrs(self, conv: Converter):
@@ -204,39 +408,90 @@ class XDevice:
         attrs.update(c.attr for c in self.converters.values() if c.parent == conv.attr)
         return attrs
 
+    @property
+    def decode_table(self):
+        """Params key => attr (tuple if shared), and (key, attr) of top level props.
+
+        Devices with the same converter layout share one table, rebuilt when converters change.
+        """
+        if self._decode_table is None:
+            layout = tuple(
+                (attr, conv.prop or attr, isinstance(conv, PropConv))
+                for attr, conv in self.converters.items()
+            )
+            if (table := DECODE_TABLES.get(layout)) is None:
+                params, top = {}, []
+                for attr, key, is_prop in layout:
+                    if not is_prop:
+                        top.append((key, attr))
+                    elif (old := params.get(key)) is None:
+                        params[key] = attr
+                    else:
+                        params[key] = (*old, attr) if isinstance(old, tuple) else (old, attr)
+                table = DECODE_TABLES[layout] = (params, tuple(top))
+            self._decode_table = table
+        return self._decode_table
+
     def decode(self, value: dict) -> dict:
-        """Decode device props for HA."""
+        """Decode device props for HA, only converters of the changed keys run."""
         payload = {}
-        for conv in self.converters.values():
-            prop = conv.prop or conv.attr
-            data = value
-            if isinstance(conv, PropConv):
-                data = value.get('params') or {}
-            if prop not in data:
-                continue
-            conv.decode(self, payload, data[prop])
+        params, top = self.decode_table
+        converters = self.converters
+        if params and (data := value.get('params')):
+            for key, val in data.items():
+                if (attr := params.get(key)) is None:
+                    continue
+                if isinstance(attr, tuple):
+                    for a in attr:
+                        converters[a].decode(self, payload, val)
+                else:
+                    converters[attr].decode(self, payload, val)
+        for key, attr in top:
+            if key in value:
+                converters[attr].decode(self, payload, value[key])
         return payload
 
+    @property
+    def event_table(self) -> Dict[str, Callable[[dict, dict], None]]:
+        """Event value => decoder, rebuilt when converters change."""
+        if self._event_table is None:
+            self._event_table = {
+                attr: conv.decoder if isinstance(conv, EventConv) else partial(conv.decode, self)
+                for attr, conv in self.converters.items()
+            }
+        return self._event_table
+
     def decode_event(self, data: dict) -> dict:
         """Decode device event for HA."""
         payload = {}
         event = data.get('value') or data.get('type')
-        if conv := self.converters.get(event):
-            value = data.get('params') or {}
-            conv.decode(self, payload, value)
+        if decoder := self.event_table.get(event):
+            decoder(payload, data.get('params') or {})
         return payload
 
+    @property
+    def encode_plan(self) -> Dict[str, tuple]:
+        """Attribute => (converter, encode into `set`), rebuilt when converters change."""
+        if self._encode_plan is None:
+            self._encode_plan = {
+                attr: (conv, isinstance(conv, PropConv))
+                for attr, conv in self.converters.items()
+            }
+        return self._encode_plan
+
     def encode(self, value: dict) -> dict:
         """Encode payload for device."""
         payload = {}
-        for conv in self.converters.values():
-            if conv.attr not in value:
+        plan = self.encode_plan
+        for attr, val in value.items():
+            if not (item := plan.get(attr)):
                 continue
-            if isinstance(conv, PropConv):
+            conv, is_prop = item
+            if is_prop:
                 dat = payload.setdefault('set', {})
             else:
                 dat = payload
-            conv.encode(self, dat, value[conv.attr])
+            conv.encode(self, dat, val)
         return payload
 
     def encode_read(self, attrs: set) -> dict:
@@ -247,10 +502,22 @@ class XDevice:
             conv.read(self, payload)
         return payload
 
+    def start_streaming(self):
+        """Hold state writes while frames are streaming."""
+        if self._stream_state is None:
+            self._stream_state = {}
+
+    def stop_streaming(self):
+        state, self._stream_state = self._stream_state, None
+        self.update(state)
+
     def update(self, value: dict):
         """Push new state to Hass entities."""
         if not value:
             return
+        if self._stream_state is not None:
+            self._stream_state.update(value)
+            return
         attrs = value.keys()
 
         for entity in self.entities.values():
@@ -260,24 +527,40 @@ class XDevice:
             if entity.added:
                 entity.async_write_ha_state()
 
+        for group in self.groups:
+            group.member_changed(self, value)
+
     async def get_node(self):
         if not self.gateway:
             return None
         return await self.gateway.send('gateway_get.node', params={'id': self.id})
 
-    async def set_prop(self, **kwargs):
-        if not self.gateway:
-            return None
-        cmd = kwargs.pop('method', 'gateway_set.prop')
-        node = {
+    def prop_node(self, **kwargs):
+        return {
             'id': self.id,
             'nt': self.nt,
             **kwargs,
         }
-        return await self.gateway.send(cmd, nodes=[node])
+
+    async def send_props(self, value: dict):
+        """Encode and send attrs, pending values of the same attribute are superseded."""
+        if not self.encode(value):
+            return False
+        if not self._commander:
+            self._commander = DeviceCommander(self)
+        return await self._commander.send(value)
+
+    async def set_prop(self, **kwargs):
+        if not self.gateway:
+            return None
+        cmd = kwargs.pop('method', self.set_method)
+        return await self.gateway.send(cmd, nodes=[self.prop_node(**kwargs)])
 
 
 class GatewayDevice(XDevice):
+    __slots__ = ()
+    via_gateway = False
+
     def __init__(self, gateway: "ProGateway"):
         super().__init__({
             'id': 0,
@@ -288,28 +571,38 @@ class GatewayDevice(XDevice):
         self.id = gateway.host
         self.name = 'Yeelight Pro'
 
-    async def add_scene(self, node: dict):
-        if not (nid := node.get('id')):
-            return
-        self.add_converter(SceneConv(f'scene_{nid}', 'button', node=node))
-        await self.setup_entities()
+    async def add_scenes(self, nodes: List[dict]):
+        """Register scene buttons in one batch."""
+        added = 0
+        for node in nodes:
+            if not (nid := node.get('id')):
+                continue
+            if conv := self.converters.get(f'scene_{nid}'):
+                conv.node = node
+                continue
+            self.add_converter(SceneConv(f'scene_{nid}', 'button', node=node))
+            added += 1
+        if added:
+            await self.setup_entities()
 
     def entity_id(self, conv: Converter):
         return f'{conv.domain}.yp_{conv.attr}'
 
 
 class LightDevice(XDevice):
+    __slots__ = ()
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converter(PropBoolConv('light', 'light', prop='p'))
         self.add_converter(DurationConv('delay', parent='light'))
         self.add_converter(DurationConv('delayoff', 'number', readable=False))
         self.add_converter(DurationConv('transition', prop='duration', parent='light'))
-        if ColorMode.BRIGHTNESS in self.color_modes:
+        if COLOR_MODE_BRIGHTNESS in self.color_modes:
             self.add_converter(BrightnessConv('brightness', prop='l', parent='light'))
-        if ColorMode.COLOR_TEMP in self.color_modes:
+        if COLOR_MODE_COLOR_TEMP in self.color_modes:
             self.add_converter(ColorTempKelvin('color_temp', prop='ct', parent='light'))
-        if ColorMode.RGB in self.color_modes:
+        if COLOR_MODE_RGB in self.color_modes:
             self.add_converter(ColorRgbConv('rgb_color', prop='c', parent='light'))
         if self.type == DeviceType.LIGHT_WITH_ZOOM_CT:
             self.add_converter(PropConv('angel', 'number'))
@@ -317,27 +610,122 @@ class LightDevice(XDevice):
     @property
     def color_modes(self):
         modes = {
-            ColorMode.ONOFF,
+            COLOR_MODE_ONOFF,
         }
         if self.type == DeviceType.LIGHT_WITH_BRIGHTNESS:
-            modes.add(ColorMode.BRIGHTNESS)
+            modes.add(COLOR_MODE_BRIGHTNESS)
         if self.type == DeviceType.LIGHT_WITH_COLOR_TEMP:
-            modes.add(ColorMode.BRIGHTNESS)
-            modes.add(ColorMode.COLOR_TEMP)
+            modes.add(COLOR_MODE_BRIGHTNESS)
+            modes.add(COLOR_MODE_COLOR_TEMP)
         if self.type == DeviceType.LIGHT_WITH_COLOR:
-            modes.add(ColorMode.BRIGHTNESS)
-            modes.add(ColorMode.COLOR_TEMP)
-            modes.add(ColorMode.RGB)
+            modes.add(COLOR_MODE_BRIGHTNESS)
+            modes.add(COLOR_MODE_COLOR_TEMP)
+            modes.add(COLOR_MODE_RGB)
         return modes
 
 
+class GroupDevice(XDevice):
+    """Gateway group, commands to the group node are fanned out by the mesh in one frame."""
+    __slots__ = ('members', 'member_states')
+    group_attrs = ()
+
+    def __init__(self, node: dict):
+        self.members: List[int] = []
+        self.member_states: Dict[int, dict] = {}
+        super().__init__(node)
+        self.set_members(node)
+
+    def set_members(self, node: dict):
+        ids = []
+        for m in node.get('nodes') or node.get('ids') or []:
+            if isinstance(m, dict):
+                m = m.get('id')
+            if m:
+                ids.append(int(m))
+        if not ids or ids == self.members:
+            return False
+        self.members = ids
+        for mid in list(self.member_states):
+            if mid not in ids:
+                self.member_states.pop(mid, None)
+        return True
+
+    def member_attrs(self, value: dict) -> dict:
+        return {k: value[k] for k in self.group_attrs if k in value}
+
+    def member_changed(self, device: XDevice, value: dict):
+        """Derive group state from member state, without reading the gateway."""
+        if device.id not in self.members:
+            return
+        if not (changed := self.member_attrs(value)):
+            return
+        self.member_states.setdefault(device.id, {}).update(changed)
+        self.update(self.aggregate(changed))
+
+    def seed_members(self, devices: List[XDevice]):
+        """Take the state of members known before the group, then update once."""
+        seeded = False
+        for dvc in devices:
+            if dvc.id not in self.members or not dvc.prop:
+                continue
+            if changed := self.member_attrs(dvc.decode(dvc.prop)):
+                self.member_states.setdefault(dvc.id, {}).update(changed)
+                seeded = True
+        if seeded:
+            self.update(self.aggregate({}))
+
+    def aggregate(self, changed: dict) -> dict:
+        return changed
+
+    @property
+    def states(self):
+        return [self.member_states[m] for m in self.members if m in self.member_states]
+
+
+class LightGroupDevice(GroupDevice, LightDevice):
+    __slots__ = ()
+    group_attrs = ('light', 'brightness', 'color_temp', 'color_temp_kelvin', 'rgb_color')
+
+    def aggregate(self, changed: dict) -> dict:
+        ons = [s for s in self.states if s.get('light')]
+        payload = {
+            **changed,
+            'light': bool(ons),
+        }
+        payload.pop('brightness', None)
+        if brs := [s['brightness'] for s in ons if s.get('brightness') is not None]:
+            payload['brightness'] = round(sum(brs) / len(brs))
+        return payload
+
+
+class SwitchGroupDevice(GroupDevice):
+    __slots__ = ()
+
+    def setup_converters(self):
+        super().setup_converters()
+        self.add_converter(PropBoolConv('switch', 'switch', prop='p'))
+
+    def member_attrs(self, value: dict) -> dict:
+        ons = [v for k, v in value.items() if k.startswith('switch')]
+        if not ons:
+            return {}
+        return {'switch': any(ons)}
+
+    def aggregate(self, changed: dict) -> dict:
+        return {'switch': any(s.get('switch') for s in self.states)}
+
+
 class ActionDevice(XDevice):
+    __slots__ = ()
+
     def setup_converters(self):
         super().setup_converters()
-        self.add_converter(Converter('action', 'sensor'))
+        self.add_converter(Converter('action', 'event'))
 
 
 class SwitchSensorDevice(ActionDevice):
+    __slots__ = ()
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converters(
@@ -348,61 +736,114 @@ class SwitchSensorDevice(ActionDevice):
 
 
 class RelayDevice(XDevice):
-    def setup_converters(self):
-        super().setup_converters()
-        switches = self.switches
-        if len(switches) == 1:
-            self.add_converter(PropBoolConv('switch', 'switch', prop='1-p'))
-        else:
-            for i, p in self.switches.items():
-                self.add_converter(PropBoolConv(f'switch{i}', 'switch', prop=f'{i}-p'))
+    __slots__ = ()
+    channel_fields = frozenset({'p'})
+
+    def channel_converters(self, channel: int, suffix):
+        return [PropBoolConv(f'switch{suffix}', 'switch', prop=f'{channel}-p')]
 
     @property
     def switches(self):
-        lst = {}
-        for i in range(1, 9):
-            if (p := self.switch_power(i)) is None:
-                continue
-            lst[i] = p
-        return lst
+        return {
+            i: p
+            for i in self.channels
+            if (p := self.switch_power(i)) is not None
+        }
 
     def switch_power(self, index=1):
         return self.prop_params.get(f'{index}-p')
 
 
 class SwitchPanelDevice(RelayDevice, SwitchSensorDevice):
+    __slots__ = ()
+    optional_keys = frozenset({'0-blp'})
+    channel_fields = frozenset({'sp'})
+
     def setup_converters(self):
         super().setup_converters()
         SwitchSensorDevice.setup_converters(self)
 
-        switches = self.switches
-        if len(switches) == 1:
-            self.add_converter(PropBoolConv('switch', 'switch', prop='1-sp'))
-        else:
-            for i, p in self.switches.items():
-                self.add_converter(PropBoolConv(f'switch{i}', 'switch', prop=f'{i}-sp'))
-        if '0-blp' in self.prop_params:
-            self.add_converter(PropBoolConv('backlight', 'light', prop='0-blp'))
+    def key_converter(self, key: str):
+        if key == '0-blp':
+            return PropBoolConv('backlight', 'light', prop=key)
+        return None
+
+    def channel_converters(self, channel: int, suffix):
+        return [PropBoolConv(f'switch{suffix}', 'switch', prop=f'{channel}-sp')]
 
     def switch_power(self, index=1):
         return self.prop_params.get(f'{index}-sp')
 
 
-class RelayDoubleDevice(XDevice):
-    def setup_converters(self):
-        self.add_converters(
-            PropBoolConv('switch1', 'switch', prop='1-p'),
-            PropBoolConv('switch2', 'switch', prop='2-p')
-        )
+class RelayDoubleDevice(RelayDevice):
+    __slots__ = ()
+    default_channels = (1, 2)
+    single_channel_attr = False
 
 
 class KnobDevice(SwitchSensorDevice):
+    __slots__ = ('_spin',)
+
+    def __init__(self, node: dict):
+        self._spin = None
+        super().__init__(node)
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converter(EventConv('knob.spin'))
 
+    @property
+    def spin_window(self):
+        return getattr(self.gateway, 'spin_window', 0)
+
+    async def event_fired(self, data: dict):
+        if not (window := self.spin_window) or (data.get('value') or data.get('type')) != 'knob.spin':
+            return await super().event_fired(data)
+        params = data.get('params') or {}
+        if self._spin is None:
+            self._spin = {
+                'params': {},
+                'count': 0,
+                'started': time.monotonic(),
+                'handle': asyncio.get_running_loop().call_later(window, self.flush_spin),
+            }
+        spin = self._spin
+        spin['count'] += 1
+        for k, v in params.items():
+            if k in KNOB_SPIN_KEYS:
+                v = spin['params'].get(k, 0) + (v or 0)
+            spin['params'][k] = v
+
+    def flush_spin(self):
+        """Emit the spin deltas accumulated in the window, one action per spinning key."""
+        spin, self._spin = self._spin, None
+        if not spin:
+            return
+        elapsed = max(time.monotonic() - spin['started'], 0.001)
+        params = spin['params']
+        others = {k: v for k, v in params.items() if k not in KNOB_SPIN_KEYS}
+        for typ in KNOB_SPIN_KEYS:
+            if not (delta := params.get(typ)):
+                continue
+            decoded = self.decode_event({'value': 'knob.spin', 'params': {**others, typ: delta}})
+            decoded.update({
+                'delta': delta,
+                'velocity': round(delta / elapsed, 2),
+                'count': spin['count'],
+            })
+            self.update(decoded)
+            _LOGGER.debug('Knob spin: %s', [self.id, decoded])
+
+    def cancel_spin(self):
+        """Drop the pending spin window, e.g. on gateway stop."""
+        if spin := self._spin:
+            self._spin = None
+            spin['handle'].cancel()
+
 
 class MotionDevice(XDevice):
+    __slots__ = ()
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converter(Converter('motion', 'binary_sensor'))
@@ -428,6 +869,8 @@ class MotionDevice(XDevice):
 
 
 class ContactDevice(XDevice):
+    __slots__ = ()
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converter(Converter('contact', 'binary_sensor'))
@@ -436,6 +879,18 @@ class ContactDevice(XDevice):
 
 
 class CoverDevice(XDevice):
+    __slots__ = ('_travel',)
+    optional_keys = frozenset({'rs'})
+
+    def __init__(self, node: dict):
+        self._travel = TravelModel()
+        super().__init__(node)
+
+    def key_converter(self, key: str):
+        if key == 'rs':
+            return PropBoolConv('reverse', 'switch', prop=key)
+        return None
+
     def setup_converters(self):
         super().setup_converters()
         self.add_converters(
@@ -443,11 +898,73 @@ class CoverDevice(XDevice):
             PropConv('position', parent='motor', prop='tp'),
             PropConv('current_position', parent='motor', prop='cp'),
         )
-        if 'rs' in self.prop_params:
-            self.add_converter(PropBoolConv('reverse', 'switch', prop='rs'))
+
+    @property
+    def travel(self):
+        return self._travel
+
+    def run_state(self, now=None):
+        travel = self._travel
+        if travel.direction > 0:
+            return COVER_STATE_OPENING
+        if travel.direction < 0:
+            return COVER_STATE_CLOSING
+        pos = travel.position(now)
+        return COVER_STATE_CLOSED if pos is not None and pos <= 3 else COVER_STATE_OPEN
+
+    def update(self, value: dict):
+        """Track motion from target and reported positions, interpolate while moving."""
+        travel = self._travel
+        now = time.monotonic()
+        if 'current_position' in value:
+            travel.correct(value['current_position'], now)
+        if 'position' in value:
+            # a repeated target is not a new motion, e.g. after pause or at startup
+            if travel.reported is not None and value['position'] != travel.reported:
+                self.travel_to(value['position'], now)
+            travel.reported = value['position']
+        if 'current_position' in value or 'position' in value:
+            if (pos := travel.position(now)) is not None:
+                value = {**value, 'current_position': round(pos), 'run_state': self.run_state(now)}
+        super().update(value)
+
+    def travel_to(self, target, now=None):
+        travel = self._travel
+        if travel.moving and travel.target == target:
+            return
+        if target != travel.position(now):
+            travel.move_to(target, now)
+        if travel.moving and (gateway := self.gateway):
+            gateway.travel_ticker.add(self)
+
+    def travel_tick(self, now=None):
+        """Push interpolated position, return False once stopped."""
+        travel = self._travel
+        if not travel.moving:
+            return False
+        if travel.arrived(now):
+            travel.stop(now)
+        XDevice.update(self, {
+            'current_position': round(travel.position(now)),
+            'run_state': self.run_state(now),
+        })
+        return travel.moving
+
+    async def send_props(self, value: dict):
+        if value.get('motor') == 'pause':
+            self._travel.stop()
+        res = await super().send_props(value)
+        if res and (target := value.get('position')) is not None:
+            # resumed to the reported target, the gateway won't report a change
+            self.travel_to(target)
+        return res
 
 
 class WifiPanelDevice(RelayDoubleDevice):
+    __slots__ = ()
+    set_method = 'device_set.prop'
+    via_gateway = False
+
     def __init__(self, node: dict):
         super().__init__({
             **node,
@@ -455,38 +972,38 @@ class WifiPanelDevice(RelayDoubleDevice):
         })
         self.name = 'Yeelight Wifi Panel'
 
-    async def set_prop(self, **kwargs):
-        kwargs['method'] = 'device_set.prop'
-        return await super().set_prop(**kwargs)
-
     def entity_id(self, conv: Converter):
         return f'{conv.domain}.yp_{self.id}_{conv.attr}'
 
     def setup_converters(self):
         super().setup_converters()
-        self.add_converter(Converter('action', 'sensor'))
+        self.add_converter(Converter('action', 'event'))
         self.add_converter(EventConv('keyClick'))
 
 
 class ClimateDevice(XDevice):
-    def setup_converters(self):
-        super().setup_converters()
-        self.add_converter(Converter('climate', 'climate'))
-        self.add_converter(PropBoolConv('is_on', parent='climate', prop='1-acp'))
-        self.add_converter(PropConv('current_temperature', parent='climate', prop='1-acct'))
-        self.add_converter(PropConv('target_temperature', parent='climate', prop='1-actt'))
-        self.add_converter(PropMapConv('mode', parent='climate', prop='1-acm', map={
-            1: HVACMode.COOL,
-            2: HVACMode.DRY,
-            4: HVACMode.FAN_ONLY,
-            8: HVACMode.HEAT
-        }))
-        self.add_converter(PropMapConv('fan_mode', parent='climate', prop='1-acf', map={
-            1: FAN_HIGH,
-            2: FAN_MEDIUM,
-            4: FAN_LOW
-        }))
-        
-        # NYI
-        # acd: Air conditioner delay switch remaining time (unit: milliseconds)
-        # aco: Whether the air conditioner is online (air conditioner online status)
\ No newline at end of file
+    """Air conditioner, or VRF controller with an indoor unit per channel."""
+    __slots__ = ()
+    channel_fields = frozenset({'acp', 'acct', 'actt', 'acm', 'acf'})
+    default_channels = (1,)
+
+    def channel_converters(self, channel: int, suffix):
+        climate = f'climate{suffix}'
+        return [
+            Converter(climate, 'climate'),
+            PropBoolConv(f'is_on{suffix}', parent=climate, prop=f'{channel}-acp'),
+            PropConv(f'current_temperature{suffix}', parent=climate, prop=f'{channel}-acct'),
+            PropConv(f'target_temperature{suffix}', parent=climate, prop=f'{channel}-actt'),
+            PropMapConv(f'mode{suffix}', parent=climate, prop=f'{channel}-acm', map=CLIMATE_MODES),
+            PropMapConv(f'fan_mode{suffix}', parent=climate, prop=f'{channel}-acf', map=CLIMATE_FAN_MODES),
+            # NYI
+            # acd: Air conditioner delay switch remaining time (unit: milliseconds)
+            # aco: Whether the air conditioner is online (air conditioner online status)
+        ]
+
+
+class VrfClimateDevice(ClimateDevice):
+    """VRF controller, indoor units are known from `ch_num` or the channels of props."""
+    __slots__ = ()
+    default_channels = ()
+    single_channel_attr = False
\ No newline at end of file
@@ -1,17 +1,50 @@
 import asyncio
 import logging
 import random
+import socket
 import json
-from typing import Callable, Dict, Union, Optional
+import time
+from typing import Callable, Dict, List, Union, Optional
 
 from .const import *
-from .device import XDevice, GatewayDevice, WifiPanelDevice
+from .device import XDevice, NodeType, GatewayDevice, GroupDevice, KnobDevice, WifiPanelDevice
 from .converters.base import Converter
+from .scheduler import SendScheduler, TokenBucket, method_priority, is_idempotent, PRIORITY_BATCH
+from .stream import LightStream
+from .recorder import TrafficRecorder, FRAME_IN, FRAME_OUT
+from .rtt import RttTable, RTO_MIN, RTO_MAX
+from .travel import TravelTicker
 
 _LOGGER = logging.getLogger(__name__)
 MSG_SPLIT = b'\r\n'
 
 
+class MetaCache:
+    """Rooms and scenes of gateway, expired by ttl or on topology change."""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.data: Dict[str, Union[asyncio.Task, dict]] = {}
+        self.times: Dict[str, float] = {}
+
+    def get(self, key):
+        if key not in self.times or time.monotonic() - self.times[key] > self.ttl:
+            return None
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.times[key] = time.monotonic()
+
+    def invalidate(self, age=0):
+        """Expire entries older than age seconds, return True if any expired."""
+        now = time.monotonic()
+        keys = [k for k, t in self.times.items() if now - t >= age]
+        for k in keys:
+            self.times.pop(k, None)
+        return bool(keys)
+
+
 class ProGateway:
     host: str = None
     port: int = 65443
@@ -20,18 +53,53 @@ class ProGateway:
     reader: Optional[asyncio.StreamReader] = None
     writer: Optional[asyncio.StreamWriter] = None
     main_task: Optional[asyncio.Task] = None
+    ready_task: Optional[asyncio.Task] = None
+    heartbeat_task: Optional[asyncio.Task] = None
+    topology_task: Optional[asyncio.Task] = None
+    meta_task: Optional[asyncio.Task] = None
+    available: bool = False
 
     def __init__(self, host: str, **options):
         self.host = host
+        self.port = options.get('port') or self.port
         self.pid = options.get('pid', 1)
         self.hass = options.get('hass')
-        self.timeout = options.get('timeout', 5)
+        self.timeout = options.get('timeout') or 5
         self.keepalive = options.get('keepalive', 60)
+        self.heartbeat_misses = options.get('heartbeat_misses', 3)
+        rto_min = options.get('rto_min', RTO_MIN)
+        rto_max = options.get('rto_max', RTO_MAX)
+        if options.get('timeout'):
+            # an explicit timeout caps the rto and is never raised by the floor
+            rto_min = min(rto_min, self.timeout)
+            if 'rto_max' not in options:
+                rto_max = self.timeout
+        self.rtt = RttTable(initial=self.timeout, floor=rto_min, ceiling=rto_max)
+        self.retry_attempts = options.get('retry_attempts', 3)
+        self.retry_deadline = options.get('retry_deadline', 10.0)
+        self.retry_stats = {'success': 0, 'retried': 0, 'exhausted': 0}
+        self.last_recv = 0.0
+        self.meta = MetaCache(options.get('meta_ttl', 600))
+        self.spin_window = options.get('spin_window', 0)  # seconds to aggregate knob spins, opt-in
+        self.merge_window = options.get('merge_window', 0)  # seconds to hold the first write, opt-in
+        self.travel_ticker = TravelTicker(options.get('cover_tick', 0.5))
+        self.topology_chunk = options.get('topology_chunk', 50)
+        self.large_frame = options.get('large_frame', 64 * 1024)
+        self.scheduler = SendScheduler(self.write, TokenBucket(
+            rate=options.get('send_rate', 20),
+            burst=options.get('send_burst', 10),
+        ))
         self.entry_id = options.get('entry_id')
         self.devices: Dict[str, "XDevice"] = {}
+        self.groups: Dict[int, List["GroupDevice"]] = {}  # member id => groups
         self.setups: Dict[str, Callable] = {}
+        self.setup_timeout = options.get('setup_timeout', 30)
+        self._setup_ready: Dict[str, asyncio.Event] = {}
+        self._setup_missing: set = set()  # platforms not forwarded in time
         self.log = options.get('logger', _LOGGER)
         self._msgs: Dict[Union[int, str], asyncio.Future] = {}
+        self._unknown: Dict[int, List[tuple]] = {}  # frames of nodes not ingested yet
+        self.recorder: Optional[TrafficRecorder] = None
 
         self.log.debug('Gateway: %s, pid: %s', host, self.pid)
 
@@ -40,14 +108,30 @@ class ProGateway:
         if '.' in domain:
             _, domain = domain.rsplit('.', 1)
         self.setups[domain] = handler
+        self._setup_missing.discard(domain)
+        self.setup_ready(domain).set()
         self.log.debug('Setup %s added for %s', domain, self.host)
 
+    def setup_ready(self, domain: str) -> asyncio.Event:
+        if not (event := self._setup_ready.get(domain)):
+            event = self._setup_ready[domain] = asyncio.Event()
+        return event
+
     async def setup_entity(self, domain: str, device: "XDevice", conv: "Converter"):
         handler = self.setups.get(domain)
+        if not handler and self.hass and domain not in self._setup_missing:
+            # wait for the platform being forwarded, once per domain
+            try:
+                await asyncio.wait_for(self.setup_ready(domain).wait(), self.setup_timeout)
+            except asyncio.TimeoutError:
+                if domain not in self._setup_missing:
+                    self._setup_missing.add(domain)
+                    self.log.warning('Setup %s not ready for %s, skip its entities', domain, self.host)
+            handler = self.setups.get(domain)
         if handler:
             handler(device, conv)
-        else:
-            self.log.warning('Setup %s not ready for %s', domain, [device, conv])
+        elif self.hass:
+            self.log.debug('Setup %s not ready for %s', domain, [device, conv])
 
     async def add_device(self, device: "XDevice"):
         if not device.hass:
@@ -56,6 +140,11 @@ class ProGateway:
             self.devices[device.id] = device
         if self not in device.gateways:
             device.gateways.append(self)
+        if isinstance(device, GroupDevice):
+            self.link_group(device)
+        for group in self.groups.get(device.id) or []:
+            if group not in device.groups:
+                device.groups.append(group)
 
         self.log.info('Setup device: %s', [device.unique_id, device.name, device])
 
@@ -64,29 +153,85 @@ class ProGateway:
             return
         await device.setup_entities()
 
-    async def start(self):
+    def link_group(self, group: "GroupDevice"):
+        """Bind group to its member devices, both may come in any order of the topology."""
+        for mid, groups in self.groups.items():
+            if mid in group.members or group not in groups:
+                continue
+            groups.remove(group)
+            if (dvc := self.devices.get(mid)) and group in dvc.groups:
+                dvc.groups.remove(group)
+        members = []
+        for mid in group.members:
+            groups = self.groups.setdefault(mid, [])
+            if group not in groups:
+                groups.append(group)
+            if dvc := self.devices.get(mid):
+                members.append(dvc)
+                if group not in dvc.groups:
+                    dvc.groups.append(group)
+        group.seed_members(members)
+
+    async def start(self, wait=True):
+        """Connect in background, wait for ready or return at once when wait is False."""
         self._msgs['ready'] = asyncio.get_event_loop().create_future()
         self.main_task = asyncio.create_task(self.run_forever())
-        await self.ready()
+        if wait:
+            await self.ready()
+        else:
+            self.ready_task = asyncio.create_task(self.ready(forever=True))
 
-    async def ready(self):
+    async def ready(self, forever=False):
         if not self.writer:
             if not (fut := self._msgs.get('ready')):
                 return None
             try:
-                await asyncio.wait_for(fut, self.timeout)
+                await asyncio.wait_for(fut, None if forever else self.timeout)
             except asyncio.TimeoutError:
                 return None
 
         await self.topology()
+        self.set_available(True)
+        if self.pid != PID_WIFI_PANEL:
+            await self.prefetch_meta()
+
+    def set_available(self, available: bool):
+        if available == self.available:
+            return
+        self.available = available
+        self.log.info('Gateway %s is %s', self.host, 'available' if available else 'unavailable')
+        for device in list(self.devices.values()):
+            if self in device.gateways:
+                device.availability_changed()
+
+    async def prefetch_meta(self):
+        """Fetch rooms and scenes concurrently, then register scene buttons in one batch."""
+        _, scenes = await asyncio.gather(
+            self.get_room(refresh=True),
+            self.get_scene(refresh=True),
+        )
+        if scenes and isinstance(self.device, GatewayDevice):
+            await self.device.add_scenes(scenes)
+
+    def on_meta_done(self, task: asyncio.Task):
+        if not task.cancelled() and (exc := task.exception()):
+            self.log.warning('Prefetch meta of %s failed: %s', self.host, [type(exc), exc])
 
     async def stop(self, *args):
-        if self.main_task and not self.main_task.cancelled():
-            self.main_task.cancel()
+        for task in (self.ready_task, self.main_task, self.topology_task, self.meta_task):
+            if task and not task.done():
+                task.cancel()
+        self.scheduler.stop()
+        self.travel_ticker.stop()
+        if self.recorder:
+            await asyncio.get_running_loop().run_in_executor(None, self.stop_recording)
+        await self.disconnect()
 
         for device in self.devices.values():
             if self in device.gateways:
                 device.gateways.remove(self)
+            if isinstance(device, KnobDevice):
+                device.cancel_spin()
 
     async def run_forever(self):
         """Main thread loop."""
@@ -116,9 +261,15 @@ class ProGateway:
             self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
             if not self.writer:
                 return False
+            self.tune_socket(self.writer.get_extra_info('socket'))
+            self.last_recv = time.monotonic()
+            if self.keepalive:
+                self.heartbeat_task = asyncio.create_task(self.heartbeat())
             if fut := self._msgs.get('ready'):
                 fut.set_result(True)
                 del self._msgs['ready']
+            else:
+                self.set_available(True)
         return True
 
     async def check_available(self):
@@ -129,6 +280,63 @@ class ProGateway:
             return exc
         return None
 
+    def tune_socket(self, sock):
+        """Send small frames at once and let the kernel probe a silent peer."""
+        if sock is None:
+            return
+        opts = [
+            (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        for name, val in [
+            ('TCP_KEEPIDLE', self.keepalive),
+            ('TCP_KEEPINTVL', self.timeout),
+            ('TCP_KEEPCNT', self.heartbeat_misses),
+        ]:
+            if val and hasattr(socket, name):
+                opts.append((socket.IPPROTO_TCP, getattr(socket, name), max(1, int(val))))
+        for level, opt, val in opts:
+            try:
+                sock.setsockopt(level, opt, val)
+            except OSError as exc:
+                self.log.debug('Set socket option %s failed: %s', opt, exc)
+
+    async def heartbeat(self):
+        """Probe the gateway when the line is idle, disconnect after missed heartbeats."""
+        writer = self.writer
+        misses = 0
+        while self.writer is writer:
+            idle = time.monotonic() - self.last_recv
+            if not misses and idle < self.keepalive:
+                await asyncio.sleep(self.keepalive - idle)
+                continue
+            sent = time.monotonic()
+            await self.get_node(retry=False)
+            if self.writer is not writer:
+                break
+            if self.last_recv >= sent:
+                misses = 0
+                continue
+            misses += 1
+            self.log.warning('Gateway %s missed heartbeat: %s/%s', self.host, misses, self.heartbeat_misses)
+            if misses >= self.heartbeat_misses:
+                self.log.error('Gateway %s is not responding, reconnecting', self.host)
+                await self.disconnect()
+
+    async def disconnect(self):
+        if not (writer := self.writer):
+            return
+        self.writer = None
+        if (task := self.heartbeat_task) and task is not asyncio.current_task():
+            task.cancel()
+        self.heartbeat_task = None
+        self.set_available(False)
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except (BrokenPipeError, Exception) as exc:
+            self.log.error('Connection close error: %s', [type(exc), exc])
+
     async def readline(self):
         msg = b''
         while True:
@@ -137,24 +345,30 @@ class ProGateway:
             except (ConnectionError, BrokenPipeError, Exception) as exc:
                 buf = None
                 if isinstance(exc, (ConnectionError, BrokenPipeError)):
-                    try:
-                        self.writer.close()
-                        await self.writer.wait_closed()
-                    except (BrokenPipeError, Exception) as ce:
-                        self.log.error('Connection close error: %s', [type(ce), ce])
-                    self.writer = None
+                    await self.disconnect()
                 self.log.error('Readline error: %s', [type(exc), exc])
                 await asyncio.sleep(self.timeout - 0.1)
             if not buf:
+                if buf == b'' and self.reader.at_eof():
+                    self.log.warning('Gateway %s closed the connection', self.host)
+                    await self.disconnect()
                 break
+            self.last_recv = time.monotonic()
             msg += buf
             if buf[-2:] == MSG_SPLIT:
+                if recorder := self.recorder:
+                    recorder.record(FRAME_IN, msg)
                 await self.on_message(msg)
                 break
         return msg
 
     async def on_message(self, msg):
-        dat = json.loads(msg.decode()) or {}
+        if len(msg) >= self.large_frame:
+            # topology of large homes, parse in worker thread
+            dat = await asyncio.get_running_loop().run_in_executor(None, json.loads, msg)
+        else:
+            dat = json.loads(msg)
+        dat = dat or {}
         cmd = dat.get('method')
         cid = cmd if cmd == 'gateway_post.topology' else dat.get('id')
         nodes = dat.get('nodes') or []
@@ -167,33 +381,118 @@ class ProGateway:
             if not self.device:
                 self.device = GatewayDevice(self)
                 await self.add_device(self.device)
+            if self.meta.invalidate(self.timeout) and not (self.meta_task and not self.meta_task.done()):
+                # topology changed
+                self.meta_task = asyncio.create_task(self.prefetch_meta())
+                self.meta_task.add_done_callback(self.on_meta_done)
+            # node list, ingested in background while props keep flowing
+            self.topology_task = asyncio.create_task(self.ingest_topology(nodes, self.topology_task))
+            return
 
         if not nodes and 'params' in dat:
             nodes = [dat['params']]
 
+        ingesting = self.topology_task and not self.topology_task.done()
         for node in nodes:
             if not (nid := node.get('id')):
                 continue
-            if is_topology:
-                # node list
-                await XDevice.from_node(self, node)
             if cmd in ['getway_post.topology'] and not self.device:
                 # wifi full screen panel
                 self.device = WifiPanelDevice(node)
                 await self.add_device(self.device)
             if not (dvc := self.devices.get(nid)):
-                self.log.warning('Device not found: %s', node)
+                if ingesting:
+                    self._unknown.setdefault(nid, []).append((cmd, node))
+                else:
+                    self.log.warning('Device not found: %s', node)
+                continue
+            await self.dispatch(dvc, cmd, node)
+
+    async def dispatch(self, dvc: "XDevice", cmd, node: dict):
+        if cmd in ['gateway_post.prop', 'device_post.prop']:
+            # node prop
+            await dvc.prop_changed(node)
+        if cmd in ['gateway_post.event', 'device_post.event']:
+            # node event
+            await dvc.event_fired(node)
+
+    async def ingest_topology(self, nodes: List[dict], previous: Optional[asyncio.Task] = None):
+        """Create devices in chunks, yielding to the loop between them."""
+        if previous and not previous.done():
+            await asyncio.wait([previous])
+        scenes = []
+        devices = []
+        for node in nodes:
+            if not node.get('id'):
                 continue
-            if cmd in ['gateway_post.prop', 'device_post.prop']:
-                # node prop
-                await dvc.prop_changed(node)
-            if cmd in ['gateway_post.event', 'device_post.event']:
-                # node event
-                await dvc.event_fired(node)
-
-    async def send(self, method, wait_result=True, **kwargs):
+            if node.get('nt') == NodeType.SCENE:
+                scenes.append(node)
+            else:
+                devices.append(node)
+        size = max(1, self.topology_chunk)
+        try:
+            for i in range(0, len(devices), size):
+                for dvc in await XDevice.from_nodes(self, devices[i:i + size]):
+                    # frames arrived before the device
+                    for cmd, node in self._unknown.pop(dvc.id, None) or []:
+                        await self.dispatch(dvc, cmd, node)
+                await asyncio.sleep(0)
+            if scenes and isinstance(self.device, GatewayDevice):
+                await self.device.add_scenes(scenes)
+        finally:
+            # drop frames of nodes this topology rejected, keep the others for a newer topology
+            last = self.topology_task is asyncio.current_task()
+            ids = {node['id'] for node in devices}
+            for nid in [k for k in self._unknown if last or k in ids]:
+                self.log.warning('Device not found: %s', nid)
+                del self._unknown[nid]
+        self.log.debug('Topology ingested: %s nodes', len(nodes))
+
+    async def wait_topology(self):
+        while (task := self.topology_task) and not task.done():
+            await asyncio.wait([task])
+
+    async def write(self, data: bytes):
         if not self.writer:
             await self.connect()
+        if recorder := self.recorder:
+            recorder.record(FRAME_OUT, data)
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def send(self, method, wait_result=True, priority=None, retry=None, **kwargs):
+        """Send command, idempotent commands are resent with backoff until retry_deadline or attempts of rto."""
+        if priority is None:
+            priority = method_priority(method)
+        if not wait_result:
+            return await self.send_once(method, False, priority, None, **kwargs)
+        if retry is None:
+            retry = is_idempotent(method, kwargs)
+        if not retry or self.retry_attempts <= 1:
+            return await self.send_once(method, True, priority, None, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        # slow methods keep their adaptive timeout for every attempt
+        deadline = loop.time() + max(self.retry_deadline, self.rtt.timeout(method) * self.retry_attempts)
+        attempt = 0
+        while True:
+            res = await self.send_once(method, True, priority, deadline - loop.time(), **kwargs)
+            if res is not None:
+                self.retry_stats['retried' if attempt else 'success'] += 1
+                return res
+            attempt += 1
+            backoff = min(2.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if attempt >= self.retry_attempts or loop.time() + backoff >= deadline or not self.writer:
+                self.retry_stats['exhausted'] += 1
+                self.log.warning('Command %s failed after %s attempts', method, attempt)
+                return None
+            self.log.info('Retry command %s in %.2fs: %s/%s', method, backoff, attempt, self.retry_attempts)
+            await asyncio.sleep(backoff)
+
+    async def send_once(self, method, wait_result=True, priority=None, budget=None, **kwargs):
+        """Send command with a new id, wait for the reply within rto or budget seconds."""
+        if priority is None:
+            priority = method_priority(method)
         if method == 'gateway_get.topology':
             cid = 'gateway_post.topology'
         else:
@@ -209,33 +508,112 @@ class ProGateway:
             **kwargs,
         }
         self.log.info('Send command: %s', dat)
-        self.writer.write(json.dumps(dat).encode() + MSG_SPLIT)
-        await self.writer.drain()
-
-        if not fut:
-            return None
         try:
-            await asyncio.wait_for(fut, self.timeout)
-        except asyncio.TimeoutError:
-            return None
+            sent = await self.scheduler.send(json.dumps(dat).encode() + MSG_SPLIT, priority)
+            if not fut:
+                return None
+            try:
+                timeout = self.rtt.timeout(method)
+                if budget is not None:
+                    timeout = max(0.01, min(timeout, budget))
+                await asyncio.wait_for(fut, timeout)
+            except asyncio.TimeoutError:
+                self.scheduler.bucket.on_timeout()
+                self.rtt.on_timeout(method)
+                return None
         finally:
-            del self._msgs[cid]
+            if fut and self._msgs.get(cid) is fut:
+                del self._msgs[cid]
+        rtt = time.monotonic() - sent
+        self.scheduler.bucket.on_ack(rtt)
+        self.rtt.on_ack(method, rtt)
         res = fut.result()
         return res
 
+    def diagnostics(self):
+        return {
+            'host': self.host,
+            'pid': self.pid,
+            'available': self.available,
+            'devices': len(self.devices),
+            'send_rate': round(self.scheduler.bucket.rate, 2),
+            'send_backlog': self.scheduler.backlog,
+            'rtt': self.rtt.as_dict(),
+            'retry': dict(self.retry_stats),
+        }
+
+    def start_recording(self, path: str):
+        """Capture inbound and outbound frames, blocking file open."""
+        self.stop_recording()
+        self.recorder = TrafficRecorder(path)
+        self.log.info('Recording %s to %s', self.host, path)
+
+    def stop_recording(self):
+        """Stop capturing, blocking file flush."""
+        if recorder := self.recorder:
+            self.recorder = None
+            recorder.close()
+            self.log.info('Recorded %s frames to %s', recorder.count, recorder.path)
+        return recorder
+
+    def write_buffer_size(self):
+        if not (transport := getattr(self.writer, 'transport', None)):
+            return 0
+        return transport.get_write_buffer_size()
+
+    def write_nowait(self, method, **kwargs):
+        """Write a command without waiting for drain or ack."""
+        if not self.writer:
+            return False
+        dat = {
+            'id': random.randint(1_000_000_000, 2_147_483_647),
+            'method': method,
+            **kwargs,
+        }
+        data = json.dumps(dat).encode() + MSG_SPLIT
+        if recorder := self.recorder:
+            recorder.record(FRAME_OUT, data)
+        self.writer.write(data)
+        return True
+
+    def light_stream(self, fps=20, **kwargs):
+        """Start streaming frames, e.g. `async with gateway.light_stream(30) as stream: stream.push(dvc, attrs)`."""
+        return LightStream(self, fps=fps, **kwargs)
+
+    async def set_props(self, nodes: List[dict], method='gateway_set.prop', wait_result=True, priority=PRIORITY_BATCH):
+        """Set props of many nodes in one frame."""
+        return await self.send(method, nodes=nodes, wait_result=wait_result, priority=priority)
+
     async def topology(self, wait_result=False):
         cmd = 'device_get.topology' if self.pid == PID_WIFI_PANEL else 'gateway_get.topology'
         await self.send(cmd, wait_result=wait_result)
 
-    async def get_node(self, nid=0, wait_result=True):
+    async def get_node(self, nid=0, wait_result=True, retry=None):
         cmd = 'device_get.node' if self.pid == PID_WIFI_PANEL else 'gateway_get.node'
-        return await self.send(cmd, params={'id': nid}, wait_result=wait_result)
+        return await self.send(cmd, params={'id': nid}, wait_result=wait_result, retry=retry)
+
+    async def get_meta(self, key, method, rid=0, refresh=False):
+        """Read metadata from cache, concurrent readers share one wire request."""
+        key = f'{key}_{rid}'
+        if not refresh and (res := self.meta.get(key)) is not None:
+            if isinstance(res, asyncio.Task):
+                return await asyncio.shield(res)
+            return res
+        task = asyncio.create_task(self.send(method, params={'id': rid}))
+        self.meta.set(key, task)
+        res = await asyncio.shield(task)
+        if res is None:
+            self.meta.data.pop(key, None)
+            self.meta.times.pop(key, None)
+        else:
+            self.meta.set(key, res)
+        return res
 
-    async def get_room(self, rid=0, wait_result=True):
-        return await self.send('gateway_get.room', params={'id': rid}, wait_result=wait_result)
+    async def get_room(self, rid=0, refresh=False):
+        return await self.get_meta('room', 'gateway_get.room', rid, refresh)
 
-    async def get_scene(self, rid=0, wait_result=True):
-        res = await self.send('gateway_get.scene', params={'id': rid}, wait_result=wait_result)
+    async def get_scene(self, rid=0, refresh=False):
+        res = await self.get_meta('scene', 'gateway_get.scene', rid, refresh)
         if res:
             res = res.get('scenes', [])
         return res
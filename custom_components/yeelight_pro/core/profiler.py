@@ -0,0 +1,139 @@
+import cProfile
+import functools
+import inspect
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .device import XDevice
+from .gateway import ProGateway
+
+_LOGGER = logging.getLogger(__name__)
+
+HOT_PATHS = [
+    (ProGateway, 'on_message'),
+    (XDevice, 'prop_changed'),
+    (XDevice, 'decode'),
+    (XDevice, 'update'),
+]
+
+
+class CallStats:
+    __slots__ = ('calls', 'total', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+def subclasses(cls: type):
+    yield cls
+    for sub in cls.__subclasses__():
+        yield from subclasses(sub)
+
+
+class HotPathProfiler:
+    """Time hot paths by patching them on their classes, only while started.
+
+    Every `sample`-th call of a function is timed, coroutine times include awaits.
+    """
+
+    active: Optional['HotPathProfiler'] = None
+
+    def __init__(self, targets: Iterable[Tuple[type, str]] = (), sample=1, cprofile=False):
+        self.targets = [*HOT_PATHS, *targets]
+        self.sample = max(1, int(sample))
+        self.profile = cProfile.Profile() if cprofile else None
+        self.stats: Dict[str, CallStats] = {}
+        self.patched: List[Tuple[type, str, object]] = []
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self):
+        if HotPathProfiler.active:
+            raise RuntimeError('Profiler already running')
+        HotPathProfiler.active = self
+        for base, name in self.targets:
+            for cls in subclasses(base):
+                if name in cls.__dict__:
+                    self.patch(cls, name)
+        if self.profile:
+            try:
+                self.profile.enable()
+            except ValueError as exc:
+                _LOGGER.warning('cProfile unavailable: %s', exc)
+                self.profile = None
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if HotPathProfiler.active is not self:
+            return
+        self.elapsed = time.perf_counter() - self.started
+        if self.profile:
+            self.profile.disable()
+        for cls, name, func in reversed(self.patched):
+            setattr(cls, name, func)
+        self.patched.clear()
+        HotPathProfiler.active = None
+
+    def patch(self, cls: type, name: str):
+        func = cls.__dict__[name]
+        stats = self.stats.setdefault(f'{cls.__name__}.{name}', CallStats())
+        sample = self.sample
+        counter = [0]
+        perf = time.perf_counter
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                counter[0] += 1
+                if counter[0] % sample:
+                    return await func(*args, **kwargs)
+                start = perf()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    stats.add(perf() - start)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                counter[0] += 1
+                if counter[0] % sample:
+                    return func(*args, **kwargs)
+                start = perf()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    stats.add(perf() - start)
+
+        setattr(cls, name, wrapper)
+        self.patched.append((cls, name, func))
+
+    def report(self) -> str:
+        lines = [
+            f'Profiled {self.elapsed:.1f}s, 1 of every {self.sample} calls timed',
+            f'{"function":<40} {"calls":>9} {"total ms":>11} {"mean us":>10} {"max us":>10}',
+        ]
+        rows = sorted(self.stats.items(), key=lambda kv: kv[1].total, reverse=True)
+        for name, st in rows:
+            if not st.calls:
+                continue
+            lines.append(
+                f'{name:<40} {st.calls:>9} {st.total * 1e3:>11.3f} '
+                f'{st.total / st.calls * 1e6:>10.1f} {st.max * 1e6:>10.1f}'
+            )
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str, stats_path: Optional[str] = None):
+        """Write the report and cProfile stats, blocking."""
+        with open(path, 'w') as file:
+            file.write(self.report())
+        if self.profile and stats_path:
+            self.profile.dump_stats(stats_path)
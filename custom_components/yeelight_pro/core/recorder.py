@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import queue
+import threading
+import time
+import logging
+from typing import List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .gateway import ProGateway
+
+_LOGGER = logging.getLogger(__name__)
+FRAME_IN = b'in'
+FRAME_OUT = b'out'
+
+
+class TrafficRecorder:
+    """Append frames to a gzip file, one `<seconds>\\t<in|out>\\t<frame>` line per frame.
+
+    Seconds are monotonic since the recorder started, every session appends a new gzip member.
+    Frames are compressed and written by a worker thread, `record` only queues them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = gzip.open(path, 'ab')
+        self.start = time.monotonic()
+        self.count = 0
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name='yeelight_pro_recorder', daemon=True)
+        self.thread.start()
+
+    def record(self, direction: bytes, frame: bytes):
+        if not self.file:
+            return
+        self.queue.put((time.monotonic() - self.start, direction, frame))
+        self.count += 1
+
+    def run(self):
+        file = self.file
+        while (item := self.queue.get()) is not None:
+            sec, direction, frame = item
+            file.write(b'%.6f\t%s\t%s\n' % (sec, direction, frame.rstrip(b'\r\n')))
+
+    def close(self):
+        """Write queued frames and close the file, blocking."""
+        if not (file := self.file):
+            return
+        self.file = None
+        self.queue.put(None)
+        self.thread.join()
+        file.close()
+
+
+class TrafficReplayer:
+    """Feed recorded inbound frames into `ProGateway.on_message`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames: List[Tuple[float, bytes, bytes]] = []
+
+    def load(self):
+        """Read the capture, blocking."""
+        frames = []
+        offset = last = 0.0
+        with gzip.open(self.path, 'rb') as file:
+            for line in file:
+                try:
+                    sec, direction, frame = line.rstrip(b'\n').split(b'\t', 2)
+                except ValueError:
+                    continue
+                sec = float(sec)
+                if sec + offset < last:
+                    # appended session, continue from the previous one
+                    offset = last - sec
+                last = sec + offset
+                frames.append((last, direction, frame))
+        self.frames = frames
+        return frames
+
+    async def replay(self, gateway: "ProGateway", speed: float = 1.0):
+        """Replay at `speed` times the recorded pace, 0 for as fast as possible."""
+        if not self.frames:
+            self.load()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = self.frames[0][0] if self.frames else 0
+        count = 0
+        for sec, direction, frame in self.frames:
+            if direction != FRAME_IN:
+                continue
+            if speed and (delay := (sec - first) / speed - (loop.time() - start)) > 0:
+                await asyncio.sleep(delay)
+            await gateway.on_message(frame + b'\r\n')
+            count += 1
+            if not speed:
+                await asyncio.sleep(0)
+        await gateway.wait_topology()
+        elapsed = loop.time() - start
+        _LOGGER.info('Replayed %s frames in %.3fs', count, elapsed)
+        return {
+            'frames': count,
+            'seconds': round(elapsed, 3),
+            'rate': round(count / elapsed, 1) if elapsed else None,
+        }
@@ -0,0 +1,83 @@
+import time
+from typing import Dict
+
+RTO_MIN = 1.0
+RTO_MAX = 30.0
+
+
+class RttEstimator:
+    """Smoothed round trip time of a method, timeout computed like TCP RTO (RFC 6298)."""
+
+    __slots__ = ('srtt', 'rttvar', 'rto', 'backoff', 'samples', 'timeouts', 'updated')
+
+    alpha = 1 / 8
+    beta = 1 / 4
+    k = 4
+    granularity = 0.01
+
+    def __init__(self, initial: float):
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+        self.backoff = 1
+        self.samples = 0
+        self.timeouts = 0
+        self.updated = 0.0
+
+    def sample(self, rtt: float, floor: float, ceiling: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.rto = min(ceiling, max(floor, self.srtt + max(self.granularity, self.k * self.rttvar)))
+        self.backoff = 1
+        self.samples += 1
+        self.updated = time.monotonic()
+
+    def timeout(self, ceiling: float):
+        """Double the next timeout until an ack is measured again."""
+        self.timeouts += 1
+        self.backoff = min(self.backoff * 2, 64)
+        return min(ceiling, self.rto * self.backoff)
+
+    def current(self, ceiling: float):
+        return min(ceiling, self.rto * self.backoff)
+
+    def as_dict(self):
+        return {
+            'srtt': None if self.srtt is None else round(self.srtt, 4),
+            'rttvar': None if self.rttvar is None else round(self.rttvar, 4),
+            'rto': round(self.rto, 4),
+            'backoff': self.backoff,
+            'samples': self.samples,
+            'timeouts': self.timeouts,
+        }
+
+
+class RttTable:
+    """Estimators per method, requests of unmeasured methods use the initial timeout."""
+
+    def __init__(self, initial=5.0, floor=RTO_MIN, ceiling=RTO_MAX):
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self.methods: Dict[str, RttEstimator] = {}
+
+    def get(self, method: str) -> RttEstimator:
+        if not (est := self.methods.get(method)):
+            est = self.methods[method] = RttEstimator(self.initial)
+        return est
+
+    def timeout(self, method: str):
+        return self.get(method).current(self.ceiling)
+
+    def on_ack(self, method: str, rtt: float):
+        self.get(method).sample(rtt, self.floor, self.ceiling)
+
+    def on_timeout(self, method: str):
+        return self.get(method).timeout(self.ceiling)
+
+    def as_dict(self):
+        return {k: v.as_dict() for k, v in sorted(self.methods.items())}
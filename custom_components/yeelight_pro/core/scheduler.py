@@ -0,0 +1,130 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0  # user control
+PRIORITY_BATCH = 1  # scenes and bulk commands
+PRIORITY_POLL = 2  # polls, metadata and debug commands
+
+
+def method_priority(method: str):
+    if '_get.' in method:
+        return PRIORITY_POLL
+    return PRIORITY_INTERACTIVE
+
+
+def is_idempotent(method: str, kwargs: dict):
+    """Reads and absolute props may be resent, actions and scenes may not."""
+    if '_get.' in method:
+        return True
+    if not method.endswith('_set.prop') or kwargs.get('scenes'):
+        return False
+    return not any(has_action(node) for node in kwargs.get('nodes') or [])
+
+
+def has_action(value):
+    """An `action` key at any depth, e.g. `{'motor': {'action': {...}}}` of covers."""
+    if isinstance(value, dict):
+        return 'action' in value or any(has_action(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(has_action(v) for v in value)
+    return False
+
+
+class TokenBucket:
+    """Pace frames to the gateway, rate is tuned by ack latency and timeouts (AIMD)."""
+
+    def __init__(self, rate=20.0, burst=10, min_rate=2.0, max_rate=50.0, target_latency=0.5):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def delay(self):
+        """Take a token, or return seconds to wait for the next one."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def on_ack(self, latency: float):
+        if latency > self.target_latency:
+            self.rate = max(self.min_rate, self.rate * 0.8)
+        else:
+            self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+    def on_timeout(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+
+class SendScheduler:
+    """Write frames in priority order, paced by a token bucket."""
+
+    def __init__(self, write: Callable[[bytes], Awaitable], bucket: Optional[TokenBucket] = None):
+        self.write = write
+        self.bucket = bucket or TokenBucket()
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.current: Optional[asyncio.Future] = None
+        self.seq = itertools.count()
+
+    def start(self):
+        if not self.task or self.task.done():
+            if not self.backlog:
+                # pending frames are kept, an empty queue is rebound to the running loop
+                self.queue = asyncio.PriorityQueue()
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self, exc: Optional[Exception] = None):
+        """Stop writing, pending senders get a ConnectionError."""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        exc = exc or ConnectionError('Scheduler stopped')
+        futs = [self.current] if self.current else []
+        self.current = None
+        while self.queue and not self.queue.empty():
+            futs.append(self.queue.get_nowait()[3])
+        for fut in futs:
+            if not fut.done():
+                fut.set_exception(exc)
+
+    @property
+    def backlog(self):
+        return self.queue.qsize() if self.queue else 0
+
+    async def send(self, data: bytes, priority=PRIORITY_INTERACTIVE):
+        """Queue a frame and wait until it is written."""
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((priority, next(self.seq), data, fut))
+        return await fut
+
+    async def run(self):
+        while True:
+            _, _, data, fut = await self.queue.get()
+            if fut.done():
+                continue
+            self.current = fut
+            while delay := self.bucket.delay():
+                await asyncio.sleep(delay)
+            try:
+                await self.write(data)
+            except Exception as exc:
+                if not fut.done():
+                    fut.set_exception(exc)
+                continue
+            finally:
+                self.current = None
+            if not fut.done():
+                fut.set_result(time.monotonic())
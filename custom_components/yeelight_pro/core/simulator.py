@@ -0,0 +1,118 @@
+import json
+import random
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from .device import NodeType, DeviceType
+
+_LOGGER = logging.getLogger(__name__)
+MSG_SPLIT = b'\r\n'
+
+SIMULATED_TYPES = [
+    (DeviceType.LIGHT_WITH_BRIGHTNESS, {'p': True, 'l': 50}),
+    (DeviceType.LIGHT_WITH_COLOR_TEMP, {'p': True, 'l': 80, 'ct': 4000}),
+    (DeviceType.LIGHT_WITH_COLOR, {'p': True, 'l': 80, 'ct': 4000, 'c': 0xFF8800}),
+    (DeviceType.SWITCH_PANEL, {'0-blp': True, '1-sp': False, '2-sp': True, '3-sp': True}),
+    (DeviceType.RELAY_DOUBLE, {'1-p': True, '2-p': False}),
+    (DeviceType.CURTAIN, {'tp': 100, 'cp': 100, 'rs': False}),
+    (DeviceType.AIR_CONDITIONER, {'1-acp': True, '1-acct': 26, '1-actt': 24, '1-acm': 1, '1-acf': 2}),
+    (DeviceType.MOTION_SENSOR, {'mv': False}),
+    (DeviceType.MAGNET_SENSOR, {}),
+    (DeviceType.KNOB, {}),
+]
+
+
+def synthetic_nodes(size: int, seed=1) -> List[dict]:
+    """Mixed home of `size` mesh devices."""
+    rnd = random.Random(seed)
+    nodes = []
+    for i in range(size):
+        typ, params = SIMULATED_TYPES[i % len(SIMULATED_TYPES)]
+        nodes.append({
+            'id': 100_000 + i,
+            'nt': int(NodeType.MESH),
+            'n': f'{typ.name.lower()} {i}',
+            'type': int(typ),
+            'cids': [rnd.choice([9, 73])],
+            'params': dict(params),
+        })
+    return nodes
+
+
+class GatewaySimulator:
+    """Local gateway speaking the line protocol, for tools and benchmarks."""
+
+    def __init__(self, nodes: List[dict], latency=0.0, jitter=0.0, loss=0.0):
+        self.nodes: Dict[int, dict] = {n['id']: n for n in nodes}
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.clients = set()
+        self.received = 0
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.server = await asyncio.start_server(self.on_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            while self.clients:
+                await asyncio.sleep(0.01)
+            await self.server.wait_closed()
+
+    async def on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
+        try:
+            while line := await reader.readline():
+                self.received += 1
+                try:
+                    dat = json.loads(line)
+                except ValueError:
+                    continue
+                asyncio.create_task(self.reply(writer, dat))
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def reply(self, writer: asyncio.StreamWriter, dat: dict):
+        if self.loss and random.random() < self.loss:
+            return
+        if delay := self.latency + random.random() * self.jitter:
+            await asyncio.sleep(delay)
+        cid = dat.get('id')
+        method = dat.get('method', '')
+        params = dat.get('params') or {}
+        msgs = []
+        if method.endswith('get.topology'):
+            nodes = [{k: v for k, v in n.items() if k != 'params'} for n in self.nodes.values()]
+            msgs.append({'id': cid, 'method': 'gateway_post.topology', 'nodes': nodes})
+        elif method.endswith('get.node'):
+            nodes = [n for n in [self.nodes.get(params.get('id'))] if n]
+            msgs.append({'id': cid, 'result': 'ok', 'nodes': nodes})
+        elif method == 'gateway_get.room':
+            msgs.append({'id': cid, 'rooms': [{'id': 1, 'n': 'Living room'}]})
+        elif method == 'gateway_get.scene':
+            msgs.append({'id': cid, 'scenes': [{'id': 6001, 'n': 'Home'}, {'id': 6002, 'n': 'Away'}]})
+        elif method.endswith('set.prop'):
+            msgs.append({'id': cid, 'result': 'ok'})
+            changed = []
+            for node in dat.get('nodes') or []:
+                if (dvc := self.nodes.get(node.get('id'))) and node.get('set'):
+                    dvc['params'].update(node['set'])
+                    changed.append({'id': dvc['id'], 'nt': dvc['nt'], 'params': node['set']})
+            if changed:
+                msgs.append({'method': 'gateway_post.prop', 'nodes': changed})
+        else:
+            msgs.append({'id': cid, 'result': 'ok'})
+        if writer.is_closing():
+            return
+        for msg in msgs:
+            writer.write(json.dumps(msg).encode() + MSG_SPLIT)
+        await writer.drain()
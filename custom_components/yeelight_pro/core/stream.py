@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .device import XDevice
+    from .gateway import ProGateway
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LightStream:
+    """Stream light frames to a gateway, fire-and-forget and latest frame wins per light."""
+
+    def __init__(self, gateway: "ProGateway", fps=20, max_buffer=8192):
+        self.gateway = gateway
+        self.interval = 1 / max(1, min(fps, 60))
+        self.max_buffer = max_buffer
+        self.devices: Dict[int, "XDevice"] = {}
+        self.frames: Dict[int, dict] = {}
+        self.task = None
+        self.sent = 0
+        self.dropped = 0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def start(self):
+        if not self.task:
+            self.task = asyncio.create_task(self.pump())
+
+    def push(self, device: "XDevice", attrs: dict):
+        """Queue a frame for the light, replacing any frame not sent yet."""
+        if device.id not in self.devices:
+            self.devices[device.id] = device
+            device.start_streaming()
+        if device.id in self.frames:
+            self.dropped += 1
+        self.frames[device.id] = attrs
+
+    async def pump(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as exc:
+                _LOGGER.warning('Light stream flush error: %s', [type(exc), exc])
+
+    def flush(self):
+        if not self.frames:
+            return
+        if self.gateway.write_buffer_size() > self.max_buffer:
+            # keep the latest frames for the next tick
+            return
+        batches = {}
+        for nid, attrs in self.frames.items():
+            dvc = self.devices[nid]
+            try:
+                payload = dvc.encode({
+                    'transition': self.interval,
+                    **attrs,
+                })
+            except Exception as exc:
+                _LOGGER.warning('Invalid light frame of %s: %s', dvc.id, [attrs, type(exc), exc])
+                self.dropped += 1
+                continue
+            if payload:
+                batches.setdefault(dvc.set_method, []).append(dvc.prop_node(**payload))
+        self.frames = {}
+        for method, nodes in batches.items():
+            if self.gateway.write_nowait(method, nodes=nodes):
+                self.sent += len(nodes)
+            else:
+                self.dropped += len(nodes)
+
+    async def stop(self):
+        """Send the last frames and resume state writes of the lights."""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        try:
+            self.flush()
+        finally:
+            for dvc in self.devices.values():
+                dvc.stop_streaming()
+        _LOGGER.debug('Light stream stopped: %s', [len(self.devices), self.sent, self.dropped])
@@ -0,0 +1,119 @@
+import time
+import asyncio
+import logging
+from typing import Optional, Set
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TravelModel:
+    """Position of a moving cover interpolated from learned full travel times."""
+
+    __slots__ = ('open_time', 'close_time', 'start', 'started', 'target', 'direction', 'reported')
+
+    min_elapsed = 0.5
+    min_delta = 5
+    learn_rate = 0.3
+
+    def __init__(self, open_time=20.0, close_time=20.0):
+        self.open_time = open_time
+        self.close_time = close_time
+        self.start = None
+        self.started = 0.0
+        self.target = None
+        self.direction = 0
+        self.reported = None  # last target position reported by the device
+
+    def as_dict(self):
+        return {'open_time': round(self.open_time, 2), 'close_time': round(self.close_time, 2)}
+
+    def load(self, data: dict):
+        """Restore learned travel times."""
+        for key in ('open_time', 'close_time'):
+            if isinstance(val := data.get(key), (int, float)) and val > 0:
+                setattr(self, key, float(val))
+
+    @property
+    def moving(self):
+        return self.direction != 0
+
+    def travel_time(self, direction):
+        return self.open_time if direction > 0 else self.close_time
+
+    def position(self, now=None):
+        if self.start is None:
+            return None
+        if not self.direction:
+            return self.start
+        now = time.monotonic() if now is None else now
+        pos = self.start + self.direction * 100 * (now - self.started) / self.travel_time(self.direction)
+        if self.direction > 0:
+            return min(pos, self.target)
+        return max(pos, self.target)
+
+    def move_to(self, target, now=None):
+        now = time.monotonic() if now is None else now
+        if (pos := self.position(now)) is None:
+            pos = 0 if target >= 50 else 100
+        self.start, self.started, self.target = pos, now, target
+        self.direction = (target > pos) - (target < pos)
+
+    def stop(self, now=None):
+        self.start = self.position(now)
+        self.direction = 0
+
+    def correct(self, current, now=None):
+        """Anchor on a reported position and learn the travel time of the direction."""
+        now = time.monotonic() if now is None else now
+        if self.direction and self.start is not None:
+            elapsed = now - self.started
+            delta = (current - self.start) * self.direction
+            if elapsed >= self.min_elapsed and delta >= self.min_delta:
+                measured = elapsed * 100 / delta
+                learned = (1 - self.learn_rate) * self.travel_time(self.direction) + self.learn_rate * measured
+                if self.direction > 0:
+                    self.open_time = learned
+                else:
+                    self.close_time = learned
+        self.start, self.started = current, now
+        if self.target is None or (current - self.target) * self.direction >= 0:
+            self.direction = 0
+
+    def arrived(self, now=None):
+        return self.direction != 0 and self.position(now) == self.target
+
+
+class TravelTicker:
+    """One loop of the gateway pushing interpolated positions of all moving covers."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.covers: Set = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, cover):
+        self.covers.add(cover)
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def discard(self, cover):
+        self.covers.discard(cover)
+
+    def stop(self):
+        self.covers.clear()
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while self.covers:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            for cover in list(self.covers):
+                try:
+                    moving = cover.travel_tick(now)
+                except Exception as exc:
+                    _LOGGER.warning('Cover tick error: %s', [cover, exc])
+                    moving = False
+                if not moving:
+                    self.covers.discard(cover)
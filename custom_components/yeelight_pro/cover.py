@@ -9,7 +9,7 @@ from homeassistant.components.cover import (
     ATTR_POSITION,
     ATTR_CURRENT_POSITION,
 )
-from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.restore_state import RestoreEntity, RestoredExtraData
 
 from . import (
     XDevice,
@@ -47,9 +47,19 @@ class XCoverEntity(XEntity, CoverEntity, RestoreEntity):
             self._attr_state = data['run_state']
             self._attr_is_opening = self._attr_state == CoverState.OPENING
             self._attr_is_closing = self._attr_state == CoverState.CLOSING
-        if ATTR_POSITION in data:
-            self._attr_current_cover_position = data[ATTR_POSITION]
-            self._attr_is_closed = self._attr_current_cover_position <= 3
+        if (pos := data.get(ATTR_CURRENT_POSITION, data.get(ATTR_POSITION))) is not None:
+            self._attr_current_cover_position = pos
+            self._attr_is_closed = pos <= 3
+
+    @property
+    def extra_restore_state_data(self):
+        """Learned travel times, kept across restarts."""
+        return RestoredExtraData(self.device.travel.as_dict())
+
+    async def async_added_to_hass(self):
+        if extra := await self.async_get_last_extra_data():
+            self.device.travel.load(extra.as_dict())
+        await super().async_added_to_hass()
 
     @callback
     def async_restore_last_state(self, state: str, attrs: dict):
@@ -0,0 +1,86 @@
+"""Device triggers of button and knob actions."""
+import voluptuous as vol
+
+from homeassistant.core import CALLBACK_TYPE, Event, HassJob, HomeAssistant, callback
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_DEVICE_ID,
+    CONF_DOMAIN,
+    CONF_ENTITY_ID,
+    CONF_PLATFORM,
+    CONF_TYPE,
+)
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.components.event import ATTR_EVENT_TYPE, ATTR_EVENT_TYPES
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
+from homeassistant.helpers.typing import ConfigType
+
+from .core.const import DOMAIN
+from .core.converters.base import BUTTON_EVENTS
+
+CONF_SUBTYPE = 'subtype'
+TRIGGER_TYPES = [*BUTTON_EVENTS, 'knob.spin']
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend({
+    vol.Required(CONF_ENTITY_ID): cv.entity_id_or_uuid,
+    vol.Required(CONF_TYPE): vol.In(TRIGGER_TYPES),
+    vol.Optional(CONF_SUBTYPE): cv.string,  # action, e.g. `button1_double`
+})
+
+
+async def async_get_triggers(hass: HomeAssistant, device_id: str):
+    registry = er.async_get(hass)
+    triggers = []
+    for entry in er.async_entries_for_device(registry, device_id):
+        if entry.domain != 'event' or entry.platform != DOMAIN:
+            continue
+        state = hass.states.get(entry.entity_id)
+        types = (state.attributes.get(ATTR_EVENT_TYPES) if state else None) or TRIGGER_TYPES
+        for typ in types:
+            if typ not in TRIGGER_TYPES:
+                continue
+            triggers.append({
+                CONF_PLATFORM: 'device',
+                CONF_DEVICE_ID: device_id,
+                CONF_DOMAIN: DOMAIN,
+                CONF_ENTITY_ID: entry.id,
+                CONF_TYPE: typ,
+            })
+    return triggers
+
+
+async def async_attach_trigger(
+    hass: HomeAssistant,
+    config: ConfigType,
+    action: TriggerActionType,
+    trigger_info: TriggerInfo,
+) -> CALLBACK_TYPE:
+    trigger_data = trigger_info['trigger_data']
+    entity_id = er.async_resolve_entity_id(er.async_get(hass), config[CONF_ENTITY_ID])
+    typ = config[CONF_TYPE]
+    subtype = config.get(CONF_SUBTYPE)
+    job = HassJob(action)
+
+    @callback
+    def handle_event(event: Event):
+        if not (state := event.data.get('new_state')):
+            return
+        if state.attributes.get(ATTR_EVENT_TYPE) != typ:
+            return
+        if subtype and state.attributes.get('action') != subtype:
+            return
+        old = event.data.get('old_state')
+        if not old or old.state == state.state:
+            return  # restored or attributes only
+        hass.async_run_hass_job(job, {
+            'trigger': {
+                **trigger_data,
+                **config,
+                'description': f'{DOMAIN} - {entity_id} {typ}',
+                ATTR_ENTITY_ID: entity_id,
+                'event': dict(state.attributes),
+            },
+        }, event.context)
+
+    return async_track_state_change_event(hass, [entity_id], handle_event)
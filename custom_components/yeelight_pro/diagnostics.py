@@ -0,0 +1,15 @@
+"""Diagnostics support for Yeelight Pro."""
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+
+from .core.const import DOMAIN, CONF_GATEWAYS
+from .core.gateway import ProGateway
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    gtw = hass.data.get(DOMAIN, {}).get(CONF_GATEWAYS, {}).get(entry.entry_id)
+    if not isinstance(gtw, ProGateway):
+        return {'gateway': None}
+    return {
+        'gateway': gtw.diagnostics(),
+    }
@@ -0,0 +1,60 @@
+"""Support for event."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.components.event import (
+    EventEntity,
+    DOMAIN as ENTITY_DOMAIN,
+)
+
+from . import (
+    XDevice,
+    XEntity,
+    Converter,
+    async_add_setuper,
+)
+from .core.converters.base import EventConv
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def setuper(add_entities):
+    def setup(device: XDevice, conv: Converter):
+        if not (entity := device.entities.get(conv.attr)):
+            entity = XEventEntity(device, conv)
+        if not entity.added:
+            add_entities([entity])
+    return setup
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    await async_add_setuper(hass, config_entry, ENTITY_DOMAIN, setuper(async_add_entities))
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    await async_add_setuper(hass, config or discovery_info, ENTITY_DOMAIN, setuper(async_add_entities))
+
+
+class XEventEntity(XEntity, EventEntity):
+    """Button and knob actions, one state write per press."""
+
+    def __init__(self, device: XDevice, conv: Converter, option=None):
+        super().__init__(device, conv, option)
+        self._attr_event_types = [
+            c.attr
+            for c in device.converters.values()
+            if isinstance(c, EventConv)
+        ]
+
+    @callback
+    def async_set_state(self, data: dict):
+        if self._name not in data or not (event := data.get('event')):
+            return
+        if event not in self._attr_event_types:
+            self._attr_event_types.append(event)
+        self._trigger_event(event, {k: v for k, v in data.items() if k != 'event'})
+        _LOGGER.info('%s: Event fired: %s', self.entity_id, data)
+
+    @callback
+    def async_restore_last_state(self, state: str, attrs: dict):
+        """Restored by EventEntity."""
@@ -0,0 +1,105 @@
+"""Benchmark fixtures, run `YP_BENCH=1 pytest tests/benchmarks` to run them,
+`YP_BENCH_UPDATE=1 pytest tests/benchmarks` to store new baselines.
+
+Benchmarks are skipped by default, baselines are machine dependent.
+A benchmark fails when its throughput drops below `baseline * (1 - tolerance)`
+or its peak memory grows above `baseline * (1 + tolerance)`,
+tolerance is read from `YP_BENCH_TOLERANCE` (default 0.5).
+"""
+import os
+import gc
+import json
+import time
+import asyncio
+import tracemalloc
+
+import pytest
+
+from custom_components.yeelight_pro.core.device import XDevice
+from custom_components.yeelight_pro.core.gateway import ProGateway
+from custom_components.yeelight_pro.core.simulator import synthetic_nodes
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+RESULTS = {}
+UPDATE = os.environ.get('YP_BENCH_UPDATE') == '1'
+ENABLED = UPDATE or os.environ.get('YP_BENCH') == '1'
+
+
+async def build_home(size):
+    gateway = ProGateway('127.0.0.1')
+    devices = []
+    for node in synthetic_nodes(size):
+        dvc = await XDevice.from_node(gateway, node)
+        await dvc.prop_changed({'id': node['id'], 'nt': node['nt'], 'o': True, 'fv': '1.0.1', 'params': node['params']})
+        devices.append(dvc)
+    return gateway, devices
+
+
+@pytest.fixture(scope='session')
+def homes():
+    cache = {}
+
+    def get(size):
+        if size not in cache:
+            cache[size] = asyncio.run(build_home(size))
+        return cache[size]
+    return get
+
+
+class Bench:
+    rounds = 3
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+
+    def __call__(self, name, batch, number, rounds=None, warmup=True):
+        """Run `batch(number)` and gate ops/s and peak memory against the baseline."""
+        if warmup:
+            batch(min(number, 10))
+        best = None
+        gc.collect()
+        for _ in range(rounds or self.rounds):
+            start = time.perf_counter()
+            batch(number)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        tracemalloc.start()
+        batch(number)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        res = RESULTS[name] = {
+            'ops': round(number / best, 1),
+            'peak_kb': round(peak / 1024, 1),
+        }
+        if not UPDATE and (base := load_baselines().get(name)):
+            assert res['ops'] >= base['ops'] * (1 - self.tolerance), f'{name} slower than baseline: {res} < {base}'
+            assert res['peak_kb'] <= base['peak_kb'] * (1 + self.tolerance) + 64, f'{name} uses more memory: {res} > {base}'
+        return res
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def bench():
+    if not ENABLED:
+        pytest.skip('benchmarks run with YP_BENCH=1')
+    return Bench(float(os.environ.get('YP_BENCH_TOLERANCE', 0.5)))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+    terminalreporter.section('yeelight_pro benchmarks')
+    for name, res in RESULTS.items():
+        terminalreporter.line(f'{name:40s} {res["ops"]:>14,.1f} ops/s {res["peak_kb"]:>10,.1f} KiB peak')
+    if UPDATE:
+        baselines = {**load_baselines(), **RESULTS}
+        with open(BASELINES, 'w') as file:
+            json.dump(dict(sorted(baselines.items())), file, indent=2)
+            file.write('\n')
+        terminalreporter.line(f'Baselines saved to {BASELINES}')
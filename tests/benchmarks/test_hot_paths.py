@@ -0,0 +1,100 @@
+import json
+import asyncio
+import itertools
+
+import pytest
+
+from .conftest import build_home
+
+SIZES = [100, 1_000, 5_000]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_build_home(bench, size):
+    bench(f'from_node[{size}]', lambda n: [run(build_home(size)) for _ in range(n)], 1, rounds=1, warmup=False)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_prop_changed(bench, homes, size):
+    _, devices = homes(size)
+    props = [
+        (dvc, {'id': dvc.id, 'nt': dvc.nt, 'params': dict(dvc.prop_params)})
+        for dvc in devices
+    ]
+
+    def batch(n):
+        async def changes():
+            for dvc, prop in itertools.islice(itertools.cycle(props), n):
+                await dvc.prop_changed(prop)
+        run(changes())
+    bench(f'prop_changed[{size}]', batch, 20_000)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_decode(bench, homes, size):
+    _, devices = homes(size)
+    props = [(dvc, {'params': dict(dvc.prop_params)}) for dvc in devices]
+
+    def batch(n):
+        for dvc, prop in itertools.islice(itertools.cycle(props), n):
+            dvc.decode(prop)
+    bench(f'decode[{size}]', batch, 20_000)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_decode_event(bench, homes, size):
+    _, devices = homes(size)
+    events = []
+    for dvc in devices:
+        if 'panel.click' in dvc.converters:
+            events.append((dvc, {'id': dvc.id, 'value': 'panel.click', 'params': {'key': 1, 'count': 2}}))
+        if 'knob.spin' in dvc.converters:
+            events.append((dvc, {'id': dvc.id, 'value': 'knob.spin', 'params': {'free_spin': 2, 'hold_spin': 0}}))
+        if 'motion.true' in dvc.converters:
+            events.append((dvc, {'id': dvc.id, 'value': 'motion.true', 'params': {}}))
+
+    def batch(n):
+        for dvc, event in itertools.islice(itertools.cycle(events), n):
+            dvc.decode_event(event)
+    bench(f'decode_event[{size}]', batch, 50_000)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_encode(bench, homes, size):
+    _, devices = homes(size)
+    values = []
+    for dvc in devices:
+        if 'light' in dvc.converters:
+            values.append((dvc, {'light': True, 'brightness': 128, 'transition': 1}))
+        if 'switch1' in dvc.converters:
+            values.append((dvc, {'switch1': True}))
+        if 'climate' in dvc.converters:
+            values.append((dvc, {'is_on': True, 'mode': 'cool', 'fan_mode': 'low', 'target_temperature': 24}))
+
+    def batch(n):
+        for dvc, value in itertools.islice(itertools.cycle(values), n):
+            dvc.encode(value)
+    bench(f'encode[{size}]', batch, 20_000)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_on_message(bench, homes, size):
+    gateway, devices = homes(size)
+    frames = []
+    for i in range(0, len(devices), 10):
+        nodes = [
+            {'id': dvc.id, 'nt': dvc.nt, 'params': dict(dvc.prop_params)}
+            for dvc in devices[i:i + 10]
+        ]
+        frames.append(json.dumps({'method': 'gateway_post.prop', 'nodes': nodes}).encode() + b'\r\n')
+
+    def batch(n):
+        async def messages():
+            for frame in itertools.islice(itertools.cycle(frames), n):
+                await gateway.on_message(frame)
+        run(messages())
+    bench(f'on_message[{size}]', batch, 2_000)
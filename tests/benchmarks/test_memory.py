@@ -0,0 +1,28 @@
+import gc
+import asyncio
+import logging
+import tracemalloc
+
+from .conftest import build_home
+
+# Memory target of the synthetic 2,000-device home (no HA entities),
+# measured 2.0 KiB per device when devices became slotted.
+HOME_SIZE = 2_000
+TARGET_BYTES_PER_DEVICE = 2_500
+
+
+def test_home_memory():
+    logging.disable(logging.CRITICAL)  # captured log records are not part of the home
+    gc.collect()
+    tracemalloc.start()
+    try:
+        gateway, devices = asyncio.run(build_home(HOME_SIZE))
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        logging.disable(logging.NOTSET)
+    per_device = current / HOME_SIZE
+    assert len(gateway.devices) == HOME_SIZE
+    assert not any(hasattr(dvc, '__dict__') for dvc in devices)
+    assert per_device <= TARGET_BYTES_PER_DEVICE
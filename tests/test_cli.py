@@ -0,0 +1,19 @@
+import json
+import asyncio
+
+from custom_components.yeelight_pro.core.__main__ import main, parse_args
+
+
+def test_cli_against_simulator(capsys):
+    args = parse_args(['bench', '--simulator', '--devices', '5', '--count', '20', '--rate', '1000', '--latency', '0'])
+    assert asyncio.run(main(args)) == 0
+    res = json.loads(capsys.readouterr().out)
+    assert res['acked'] == 20
+    assert res['failed'] == 0
+    assert res['p50_ms'] <= res['p99_ms']
+
+    args = parse_args(['dump', '--simulator', '--devices', '5', '--latency', '0'])
+    assert asyncio.run(main(args)) == 0
+    res = json.loads(capsys.readouterr().out)
+    assert len(res['topology']) == 5
+    assert res['rooms'][0]['n'] == 'Living room'
@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import subprocess
+
+INTEGRATION_DIR = os.path.join(os.path.dirname(__file__), '..', 'custom_components', 'yeelight_pro')
+
+# Importing homeassistant is blocked, so core/ must stand alone.
+SCRIPT = '''
+import sys, json, time
+class BlockHass:
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] == 'homeassistant':
+            raise ImportError(name)
+sys.meta_path.insert(0, BlockHass())
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import core.gateway, core.device, core.scheduler, core.recorder, core.stream
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'hass': any(m.split('.')[0] == 'homeassistant' for m in sys.modules),
+}))
+'''
+
+
+def test_core_import_without_hass():
+    out = subprocess.run(
+        [sys.executable, '-c', SCRIPT, os.path.abspath(INTEGRATION_DIR)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    res = json.loads(out)
+    assert res['hass'] is False
+    assert res['seconds'] < 0.5
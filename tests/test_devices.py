@@ -1,4 +1,6 @@
+import sys
 import asyncio
+import pytest
 
 from homeassistant.core import HomeAssistant
 from custom_components.yeelight_pro.core.device import (
@@ -6,6 +8,11 @@ from custom_components.yeelight_pro.core.device import (
     LightDevice,
     RelayDevice,
     SwitchPanelDevice,
+    LightGroupDevice,
+    ClimateDevice,
+    CoverDevice,
+    VrfClimateDevice,
+    GatewayDevice,
 )
 from .test_gateway import get_gateway
 
@@ -71,3 +78,248 @@ def test_switch_panel():
     assert data['switch2'] is True
     assert data['switch3'] is True
     assert data['backlight'] is True
+
+
+def test_light_group():
+    gtw = get_gateway()
+    members = [
+        LightDevice({"nt": 2, "id": 1301, "n": "筒灯1", "type": 2}),
+        LightDevice({"nt": 2, "id": 1302, "n": "筒灯2", "type": 2}),
+    ]
+    for dvc in members:
+        gtw.devices[dvc.id] = dvc
+    group = LightGroupDevice({"nt": 4, "id": 1300, "n": "筒灯组", "type": 2, "nodes": [{"id": 1301}, {"id": 1302}]})
+    gtw.link_group(group)
+    assert all(group in dvc.groups for dvc in members)
+
+    members[0].update(members[0].decode({"params": {"p": True, "l": 40}}))
+    members[1].update(members[1].decode({"params": {"p": False, "l": 100}}))
+    assert group.aggregate({})['light'] is True
+    assert group.aggregate({})['brightness'] == round(255 * 40 / 100)
+
+    members[0].update(members[0].decode({"params": {"p": False}}))
+    assert group.aggregate({}) == {'light': False}
+
+    asyncio.run(members[1].prop_changed({"params": {"p": True, "l": 60}}))
+    late = LightGroupDevice({"nt": 4, "id": 1307, "type": 2, "nodes": [{"id": 1301}, {"id": 1302}]})
+    gtw.link_group(late)
+    assert late.member_states == {1302: {'light': True, 'brightness': round(255 * 60 / 100)}}, 'seeded from members'
+    assert late.aggregate({})['light'] is True
+
+    node = {"nt": 3, "id": 1303, "n": "开关组", "type": 13, "nodes": [{"id": 1304}]}
+    assert type(asyncio.run(XDevice.from_node(gtw, node))).__name__ == 'SwitchGroupDevice'
+    node = {"nt": 3, "id": 1305, "n": "窗帘组", "type": 6, "nodes": [{"id": 1306}]}
+    assert asyncio.run(XDevice.from_node(gtw, node)) is None, 'only light and switch groups'
+
+
+def test_climate_encode():
+    device = ClimateDevice({"nt": 2, "id": 1280, "n": "空调", "type": 15})
+    payload = device.encode({'is_on': True, 'mode': 'heat', 'fan_mode': 'low', 'unknown': 1})
+    assert payload == {'set': {'1-acp': True, '1-acm': 8, '1-acf': 4}}
+    with pytest.raises(ValueError):
+        device.encode({'mode': 'auto'})
+
+
+def test_command_supersession():
+    gtw = get_gateway()
+    device = LightDevice({"nt": 2, "id": 1290, "n": "台灯", "type": 2})
+    device.gateways.append(gtw)
+    sent = []
+
+    async def send(method, nodes=None, **kwargs):
+        sent.append(nodes[0]['set'])
+        await asyncio.sleep(0.01)
+        return {'result': 'ok'}
+
+    async def run():
+        gtw.send = send
+        first = asyncio.create_task(device.send_props({'brightness': 0}))
+        await asyncio.sleep(0.001)
+        return [await first, *await asyncio.gather(*[
+            device.send_props({'brightness': v})
+            for v in range(25, 255, 25)
+        ])]
+
+    res = asyncio.run(run())
+    assert sent == [{'l': 0}, {'l': 98}]
+    assert res[0] == res[-1] == {'result': 'ok'}
+    assert res[1:-1] == [None] * (len(res) - 2)
+
+    async def cancelled():
+        first = asyncio.create_task(device.send_props({'brightness': 0}))
+        await asyncio.sleep(0.001)
+        pending = asyncio.create_task(device.send_props({'brightness': 50}))
+        await asyncio.sleep(0)
+        pending.cancel()
+        return await asyncio.gather(first, device.send_props({'brightness': 100}))
+
+    assert asyncio.run(cancelled()) == [{'result': 'ok'}] * 2, 'a cancelled pending caller is superseded quietly'
+
+
+def test_device_info():
+    gtw = get_gateway()
+    gtw.device = GatewayDevice(gtw)
+    device = LightDevice({"nt": 2, "id": 1291, "n": "床头灯", "type": 2})
+    device.gateways.append(gtw)
+    info = device.device_info
+    assert info['via_device'] == ('yeelight_pro', '127.0.0.1')
+    assert device.device_info is info
+
+    asyncio.run(device.prop_changed({"params": {"p": True, "l": 10}, "fv": "1.0.1"}))
+    assert device.device_info is not info
+    assert device.device_info['sw_version'] == '1.0.1'
+    info = device.device_info
+    asyncio.run(device.prop_changed({"params": {"l": 20}, "fv": "1.0.1"}))
+    assert device.device_info is info
+    device.name = '卧室灯'
+    assert device.device_info['name'] == '卧室灯'
+    assert device.prop['params'] == {'l': 20}, 'params are replaced'
+    key = ''.join(['c', 't'])
+    asyncio.run(device.prop_changed({"params": {key: 3000}}))
+    assert next(iter(device.prop['params'])) is sys.intern('ct'), 'params keys are interned'
+
+
+def test_command_merge():
+    gtw = get_gateway()
+    device = ClimateDevice({"nt": 2, "id": 1292, "n": "空调", "type": 15})
+    device.gateways.append(gtw)
+    sent = []
+
+    async def send(method, nodes=None, **kwargs):
+        sent.append(nodes[0]['set'])
+        return {'result': 'ok'}
+
+    async def run():
+        gtw.send = send
+        return await asyncio.gather(
+            device.send_props({'is_on': True, 'mode': 'heat'}),
+            device.send_props({'target_temperature': 26}),
+            device.send_props({'fan_mode': 'high'}),
+        )
+
+    res = asyncio.run(run())
+    assert sent == [{'1-acp': True, '1-acm': 8, '1-actt': 26, '1-acf': 1}]
+    assert res == [{'result': 'ok'}] * 3
+
+
+def test_cover_travel():
+    from custom_components.yeelight_pro.core.travel import TravelModel
+    model = TravelModel(open_time=10, close_time=20)
+    model.correct(0, now=0)
+    model.move_to(100, now=0)
+    assert model.position(now=5) == 50
+    assert model.position(now=12) == 100
+    model.correct(40, now=5)  # slower than modeled: 12.5s per full travel
+    assert model.open_time == 0.7 * 10 + 0.3 * 12.5
+    assert model.moving
+    model.correct(100, now=14)
+    assert not model.moving
+
+    gtw = get_gateway()
+    gtw.travel_ticker.interval = 0.01
+    device = CoverDevice({"nt": 2, "id": 1293, "n": "窗帘", "type": 6})
+    device.gateways.append(gtw)
+    device.travel.open_time = device.travel.close_time = 0.1
+
+    async def run():
+        await device.prop_changed({"params": {"tp": 0, "cp": 0}})
+        await device.prop_changed({"params": {"tp": 100}})
+        assert device.run_state() == 'opening'
+        await asyncio.sleep(0.2)
+        assert device.run_state() == 'open'
+        assert device.travel.position() == 100
+        assert not gtw.travel_ticker.covers
+
+        await device.prop_changed({"params": {"tp": 30}})
+        assert device.run_state() == 'closing'
+        device.travel.stop()
+        await device.prop_changed({"params": {"tp": 30, "rs": False}})
+        assert not device.travel.moving, 'repeated target after pause is not a motion'
+
+    asyncio.run(run())
+
+    device = CoverDevice({"nt": 2, "id": 1298, "type": 6})
+    asyncio.run(device.prop_changed({"params": {"tp": 100, "cp": 40}}))
+    assert not device.travel.moving, 'target reported at startup is not a motion'
+    device.travel.load({'open_time': 12.5, 'close_time': 'bad'})
+    assert device.travel.as_dict() == {'open_time': 12.5, 'close_time': 20.0}
+
+
+def test_vrf_channels():
+    from custom_components.yeelight_pro.core.converters.base import parse_channel_key
+    assert parse_channel_key('12-acp') == (12, 'acp')
+    assert parse_channel_key('p') is None
+    assert parse_channel_key('0-blp') == (0, 'blp')
+
+    node = {"id": 1294, "nt": 2, "n": "多联机", "type": 10}
+    device = asyncio.run(XDevice.from_node(get_gateway(), node))
+    assert isinstance(device, VrfClimateDevice)
+    params = {f'{i}-acp': i % 2 == 0 for i in range(1, 17)}
+    asyncio.run(device.prop_changed({"params": params}))
+    assert device.channels == tuple(range(1, 17))
+    assert device.decode({"params": {"16-acp": True, "3-acm": 8}}) == {'is_on16': True, 'mode3': 'heat'}
+    assert device.encode({'is_on2': False, 'fan_mode2': 'low'}) == {'set': {'2-acp': False, '2-acf': 4}}
+
+    converters = dict(device.converters)
+    asyncio.run(device.prop_changed({"params": {"17-acp": True}}))
+    assert device.channels[-1] == 17
+    assert all(device.converters[k] is v for k, v in converters.items()), 'known channels are kept'
+    assert device.decode({"params": {"17-acp": True}}) == {'is_on17': True}
+
+
+def test_incremental_setup(monkeypatch):
+    gtw = get_gateway()
+    setups = []
+
+    async def setup_entity(domain, device, conv):
+        setups.append(conv.attr)
+
+    gtw.setup_entity = setup_entity
+    node = {"id": 1295, "nt": 2, "n": "开关", "type": 13}
+    device = asyncio.run(XDevice.from_node(gtw, node))
+    setups.clear()
+    converters = dict(device.converters)
+
+    asyncio.run(device.prop_changed({"params": {"1-sp": True, "2-sp": False}}))
+    assert setups == ['switch1', 'switch2']
+    assert all(device.converters[k] is v for k, v in converters.items())
+
+    setups.clear()
+    for _ in range(3):
+        asyncio.run(device.prop_changed({"o": True, "params": {"1-sp": False}}))
+    assert setups == [], 'steady state props skip setup'
+
+    calls = []
+    add_keys = SwitchPanelDevice.add_keys
+    monkeypatch.setattr(SwitchPanelDevice, 'add_keys', lambda self, keys: calls.append(keys) or add_keys(self, keys))
+    for i in range(8):
+        asyncio.run(device.prop_changed({"params": {f"{i % 2 + 1}-sp": True}}))
+    assert calls == [], 'keys seen in earlier frames are known'
+
+    asyncio.run(device.prop_changed({"params": {"0-blp": True, "3-sp": True}}))
+    assert setups == ['backlight', 'switch3']
+
+    other = asyncio.run(XDevice.from_node(gtw, {**node, "id": 1297}))
+    asyncio.run(other.prop_changed({"params": {"0-blp": True}}))
+    assert other.converters['backlight'] is not device.converters['backlight'], 'converters are per device'
+
+
+def test_setup_platform_missing():
+    gtw = get_gateway()
+    gtw.hass = True
+    gtw.setup_timeout = 0.05
+    device = LightDevice({"id": 1296, "nt": 2, "type": 1})
+    conv = device.converters['light']
+    setups = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(10):
+            await gtw.setup_entity('event', device, conv)
+        assert loop.time() - start < 0.5, 'missing platform is waited once'
+        gtw.add_setup('event', lambda d, c: setups.append(c.attr))
+        await gtw.setup_entity('event', device, conv)
+
+    asyncio.run(run())
+    assert setups == ['light']
@@ -0,0 +1,109 @@
+import asyncio
+import random
+import time
+
+from custom_components.yeelight_pro.core.device import (
+    KnobDevice,
+    MotionDevice,
+    SwitchPanelDevice,
+    WifiPanelDevice,
+)
+
+
+def test_panel_events():
+    device = SwitchPanelDevice({"id": 1271, "nt": 2, "type": 13})
+    data = device.decode_event({"value": "panel.click", "params": {"key": 2, "count": 2}})
+    assert data == {'action': 'button2_double', 'event': 'panel.click', 'button': 2, 'key': 2, 'count': 2}
+    data = device.decode_event({"value": "panel.hold", "params": {"key": 1}})
+    assert data['action'] == 'button1_hold'
+    data = device.decode_event({"value": "panel.click", "params": {"key": 3, "count": 5}})
+    assert data['action'] == 'button3_click'
+    assert device.decode_event({"value": "unknown"}) == {}
+
+    device = WifiPanelDevice({"id": 1272, "nt": 2})
+    data = device.decode_event({"type": "keyClick", "params": {"key": 4}})
+    assert data['action'] == 'button4'
+
+
+def test_knob_and_sensor_events():
+    device = KnobDevice({"id": 1274, "nt": 2, "type": 132})
+    data = device.decode_event({"value": "knob.spin", "params": {"free_spin": 0, "hold_spin": -3}})
+    assert data['action'] == 'hold_spin'
+    data = device.decode_event({"value": "knob.spin", "params": {"free_spin": 2, "2-free_spin": 1}})
+    assert data['action'] == '2-free_spin'
+
+    device = MotionDevice({"id": 1275, "nt": 2, "type": 129, "cids": [9]})
+    assert device.decode_event({"value": "motion.true"}) == {'motion': True}
+    assert device.decode_event({"value": "motion.false", "params": {"x": 1}}) == {'motion': False, 'x': 1}
+
+
+def test_knob_spin_aggregation():
+    from .test_gateway import get_gateway
+    gtw = get_gateway()
+    gtw.spin_window = 0.05
+    actions = []
+
+    class Knob(KnobDevice):
+        __slots__ = ()
+
+        def update(self, value: dict):
+            actions.append(value)
+
+    device = Knob({"id": 1276, "nt": 2, "type": 132})
+    device.gateways.append(gtw)
+
+    async def run():
+        for _ in range(10):
+            await device.event_fired({"value": "knob.spin", "params": {"free_spin": 1, "hold_spin": 0}})
+        await device.event_fired({"value": "knob.spin", "params": {"free_spin": 0, "hold_spin": -2}})
+        await device.event_fired({"value": "panel.click", "params": {"key": 1}})
+        await asyncio.sleep(0.1)
+        await device.event_fired({"value": "knob.spin", "params": {"free_spin": 1}})
+        device.cancel_spin()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert [a['action'] for a in actions] == ['button1_click', 'free_spin', 'hold_spin']
+    assert actions[1]['free_spin'] == actions[1]['delta'] == 10
+    assert actions[2]['hold_spin'] == actions[2]['delta'] == -2
+    assert actions[1]['count'] == 11
+    assert 100 < actions[1]['velocity'] <= 200, 'velocity over the actual window'
+    assert get_gateway().spin_window == 0, 'aggregation is opt-in'
+
+
+def test_event_dispatch_throughput():
+    """Events per second of panel and knob traffic."""
+    rnd = random.Random(1)
+    panels = [SwitchPanelDevice({"id": 2000 + i, "nt": 2, "type": 13}) for i in range(50)]
+    knobs = [KnobDevice({"id": 3000 + i, "nt": 2, "type": 132}) for i in range(10)]
+    events = []
+    for _ in range(20_000):
+        if rnd.random() < 0.8:
+            dvc = rnd.choice(panels)
+            value = rnd.choice(['panel.click', 'panel.hold', 'panel.release'])
+            params = {'key': rnd.randint(1, 4), 'count': rnd.randint(1, 3)}
+        else:
+            dvc = rnd.choice(knobs)
+            value = 'knob.spin'
+            params = {'free_spin': rnd.randint(-3, 3), 'hold_spin': 0}
+        events.append((dvc, {'id': dvc.id, 'value': value, 'params': params}))
+
+    start = time.perf_counter()
+    for dvc, event in events:
+        dvc.decode_event(event)
+    eps = len(events) / (time.perf_counter() - start)
+    assert eps > 10_000
+
+
+def test_event_entity():
+    from custom_components.yeelight_pro.event import XEventEntity
+    device = KnobDevice({"id": 1276, "nt": 2, "type": 132})
+    assert device.converters['action'].domain == 'event'
+    entity = XEventEntity(device, device.converters['action'])
+    assert 'knob.spin' in entity.event_types
+    entity.async_set_state({'motion': True})
+    assert entity.state is None
+    entity.async_set_state(device.decode_event({"value": "knob.spin", "params": {"free_spin": 2}}))
+    assert entity.state is not None
+    assert entity.state_attributes['event_type'] == 'knob.spin'
+    assert entity.state_attributes['action'] == 'free_spin'
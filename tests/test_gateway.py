@@ -1,3 +1,4 @@
+import json
 import asyncio
 
 from homeassistant.core import HomeAssistant
@@ -15,6 +16,17 @@ class Hass(HomeAssistant):
         self.events.append(args)
 
 
+class Writer:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data):
+        self.frames.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
 def get_gateway(host=None):
     if not host:
         host = '127.0.0.1'
@@ -25,3 +37,353 @@ def test_gateway():
     host = '127.0.0.1'
     gtw = get_gateway(host)
     assert gtw.host == host
+
+
+def test_set_props():
+    from custom_components.yeelight_pro.core.device import LightDevice
+    gtw = get_gateway()
+    gtw.writer = Writer()
+    nodes = []
+    for nid in [1270, 1271]:
+        dvc = LightDevice({"nt": 2, "id": nid, "type": 2})
+        nodes.append(dvc.prop_node(**dvc.encode({'light': True, 'brightness': 255})))
+    asyncio.run(gtw.set_props(nodes, wait_result=False))
+    assert len(gtw.writer.frames) == 1
+    frame = gtw.writer.frames[0]
+    assert frame['method'] == 'gateway_set.prop'
+    assert frame['nodes'][1] == {'id': 1271, 'nt': 2, 'set': {'p': True, 'l': 100}}
+
+
+def test_meta_cache():
+    gtw = get_gateway()
+    sent = []
+
+    async def send(method, **kwargs):
+        sent.append(method)
+        await asyncio.sleep(0.01)
+        return {'id': 1, 'scenes': [{'id': 6001, 'n': 'Home'}]}
+
+    async def run():
+        gtw.send = send
+        res = await asyncio.gather(gtw.get_scene(), gtw.get_scene(), gtw.get_room())
+        assert res[0] == res[1] == [{'id': 6001, 'n': 'Home'}]
+        assert sorted(sent) == ['gateway_get.room', 'gateway_get.scene']
+        await gtw.get_scene()
+        assert len(sent) == 2
+        gtw.meta.invalidate()
+        await gtw.get_scene()
+        assert len(sent) == 3
+
+        gtw.timeout = 0
+        await gtw.on_message(b'{"method": "gateway_post.topology", "nodes": []}\r\n')
+        task = gtw.meta_task
+        assert task and not task.done(), 'topology change refreshes meta in a tracked task'
+        await gtw.stop()
+        await asyncio.sleep(0)
+        assert task.cancelled()
+
+    asyncio.run(run())
+
+
+def test_light_stream():
+    from custom_components.yeelight_pro.core.device import LightDevice
+    gtw = get_gateway()
+    gtw.writer = Writer()
+    dvc = LightDevice({"nt": 2, "id": 1270, "type": 4})
+
+    async def run():
+        async with gtw.light_stream(fps=30) as stream:
+            for v in range(1, 6):
+                stream.push(dvc, {'brightness': v})
+            dvc.update({'brightness': 1})
+            assert dvc._stream_state == {'brightness': 1}
+        assert dvc._stream_state is None
+        assert stream.dropped == 4
+
+    asyncio.run(run())
+    assert len(gtw.writer.frames) == 1
+    assert gtw.writer.frames[0]['nodes'][0] == {'id': 1270, 'nt': 2, 'duration': 33, 'set': {'l': 2}}
+
+    color = LightDevice({"nt": 2, "id": 1271, "type": 4})
+
+    async def invalid():
+        async with gtw.light_stream(fps=30) as stream:
+            stream.push(color, {'rgb_color': 'red'})
+            stream.push(dvc, {'brightness': 255})
+            await asyncio.sleep(0.05)
+            assert not stream.task.done(), 'a bad frame does not kill the pump'
+        assert color._stream_state is None
+
+    asyncio.run(invalid())
+    assert gtw.writer.frames[-1]['nodes'] == [{'id': 1270, 'nt': 2, 'duration': 33, 'set': {'l': 100}}]
+
+
+def test_send_scheduler():
+    from custom_components.yeelight_pro.core.scheduler import (
+        SendScheduler,
+        TokenBucket,
+        PRIORITY_INTERACTIVE,
+        PRIORITY_POLL,
+    )
+    written = []
+
+    async def write(data):
+        written.append(data)
+
+    async def run():
+        scheduler = SendScheduler(write, TokenBucket(rate=200, burst=1))
+        polls = [scheduler.send(f'poll{i}'.encode(), PRIORITY_POLL) for i in range(5)]
+        tasks = [asyncio.create_task(c) for c in polls]
+        await asyncio.sleep(0)
+        await scheduler.send(b'control', PRIORITY_INTERACTIVE)
+        await asyncio.gather(*tasks)
+        scheduler.stop()
+
+    asyncio.run(run())
+    assert written.index(b'control') <= 1
+    assert len(written) == 6
+
+    async def pending():
+        scheduler = SendScheduler(write, TokenBucket(rate=1, burst=1))
+        tasks = [asyncio.create_task(scheduler.send(b'late', PRIORITY_POLL)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        scheduler.stop()
+        res = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(r, ConnectionError) for r in res[1:]), 'queued senders are released'
+        assert scheduler.backlog == 0
+
+    asyncio.run(asyncio.wait_for(pending(), 2))
+
+    bucket = TokenBucket(rate=20, min_rate=2)
+    bucket.on_timeout()
+    assert bucket.rate == 10
+    bucket.on_ack(2.0)
+    assert bucket.rate == 8
+
+
+def test_traffic_replay(tmp_path):
+    from custom_components.yeelight_pro.core.recorder import TrafficReplayer
+    path = str(tmp_path / 'capture.rec.gz')
+    gtw = get_gateway()
+    gtw.start_recording(path)
+    gtw.recorder.record(b'in', b'{"method": "gateway_post.topology", "nodes": [{"id": 1270, "nt": 2, "type": 2}]}\r\n')
+    gtw.recorder.record(b'out', b'{"id": 1, "method": "gateway_get.node"}\r\n')
+    gtw.recorder.record(b'in', b'{"method": "gateway_post.prop", "nodes": [{"id": 1270, "nt": 2, "params": {"p": true}}]}\r\n')
+    gtw.stop_recording()
+    gtw.start_recording(path)
+    gtw.recorder.record(b'in', b'{"method": "gateway_post.event", "nodes": []}\r\n')
+    gtw.stop_recording()
+
+    replayer = TrafficReplayer(path)
+    frames = replayer.load()
+    assert [d for _, d, _ in frames] == [b'in', b'out', b'in', b'in']
+    assert frames == sorted(frames, key=lambda f: f[0])
+
+    target = get_gateway()
+    res = asyncio.run(replayer.replay(target, speed=0))
+    assert res['frames'] == 3
+    assert target.devices[1270].prop['params'] == {'p': True}
+
+
+def test_background_start():
+    from custom_components.yeelight_pro.core.simulator import GatewaySimulator, synthetic_nodes
+
+    async def run():
+        sim = GatewaySimulator(synthetic_nodes(3))
+        port = await sim.start()
+        gtw = ProGateway('127.0.0.1', port=port)
+        await gtw.start(wait=False)
+        assert not gtw.available
+        for _ in range(100):
+            if len(gtw.devices) > 3:
+                break
+            await asyncio.sleep(0.01)
+        assert gtw.available
+        assert all(d.available for d in gtw.devices.values())
+        await gtw.stop()
+        assert not gtw.available
+        await sim.stop()
+
+        unreachable = ProGateway('127.0.0.1', port=port, timeout=0.1)
+        await unreachable.start(wait=False)
+        await asyncio.sleep(0.2)
+        assert not unreachable.available
+        await unreachable.stop()
+
+    asyncio.run(run())
+
+
+def test_heartbeat_reconnect():
+    from custom_components.yeelight_pro.core.simulator import GatewaySimulator, synthetic_nodes
+
+    async def run():
+        sim = GatewaySimulator(synthetic_nodes(1))
+        port = await sim.start()
+        gtw = ProGateway('127.0.0.1', port=port, timeout=0.05, keepalive=0.05, heartbeat_misses=2)
+        await gtw.start()
+        writer = gtw.writer
+        await asyncio.sleep(0.2)
+        assert gtw.writer is writer, 'replied heartbeats keep the link'
+
+        sim.loss = 1  # half-open: connected but silent
+        for _ in range(50):
+            if gtw.writer is not writer:
+                break
+            await asyncio.sleep(0.02)
+        assert gtw.writer is not writer
+        sim.loss = 0
+        for _ in range(50):
+            if gtw.writer and gtw.available:
+                break
+            await asyncio.sleep(0.02)
+        assert gtw.available
+        await gtw.stop()
+        await sim.stop()
+
+    asyncio.run(run())
+
+
+def test_progressive_topology():
+    from custom_components.yeelight_pro.core.simulator import synthetic_nodes
+
+    async def run():
+        gtw = ProGateway('127.0.0.1', topology_chunk=20, large_frame=1024)
+        nodes = synthetic_nodes(200)
+        last = nodes[-1]
+        topology = json.dumps({'method': 'gateway_post.topology', 'nodes': nodes}).encode() + b'\r\n'
+        prop = json.dumps({'method': 'gateway_post.prop', 'nodes': [
+            {'id': last['id'], 'nt': 2, 'params': {'p': False}},
+        ]}).encode() + b'\r\n'
+        await gtw.on_message(topology)
+        await gtw.on_message(prop)
+        assert len(gtw.devices) < len(nodes), 'ingestion must not block the reader'
+        await gtw.wait_topology()
+        assert len(gtw.devices) == len(nodes) + 1
+        assert gtw.devices[last['id']].prop['params']['p'] is False
+
+        # frames of a node in the next topology survive the current one
+        gtw = ProGateway('127.0.0.1', topology_chunk=5)
+        nodes = synthetic_nodes(60)
+        for frame in [nodes[:50], nodes]:
+            await gtw.on_message(json.dumps({'method': 'gateway_post.topology', 'nodes': frame}).encode() + b'\r\n')
+        await gtw.on_message(json.dumps({'method': 'gateway_post.prop', 'nodes': [
+            {'id': nodes[-1]['id'], 'nt': 2, 'params': {'p': True}},
+        ]}).encode() + b'\r\n')
+        await gtw.wait_topology()
+        assert gtw.devices[nodes[-1]['id']].prop['params'] == {'p': True}
+        assert not gtw._unknown
+
+    asyncio.run(run())
+
+
+def test_rtt_timeouts():
+    from custom_components.yeelight_pro.core.rtt import RttTable
+    rtt = RttTable(initial=5, floor=0.2, ceiling=10)
+    assert rtt.timeout('gateway_set.prop') == 5
+    for _ in range(20):
+        rtt.on_ack('gateway_set.prop', 0.05)
+    assert rtt.timeout('gateway_set.prop') == 0.2, 'floor'
+    for _ in range(20):
+        rtt.on_ack('gateway_get.topology', 4)
+    assert 4 < rtt.timeout('gateway_get.topology') < 5
+    assert rtt.on_timeout('gateway_set.prop') == 0.4
+    rtt.on_timeout('gateway_get.topology')
+    assert rtt.on_timeout('gateway_get.topology') == 10, 'ceiling'
+    rtt.on_ack('gateway_set.prop', 0.05)
+    assert rtt.timeout('gateway_set.prop') == 0.2
+    assert rtt.as_dict()['gateway_set.prop']['timeouts'] == 1
+
+    gtw = ProGateway('127.0.0.1')
+    assert (gtw.rtt.floor, gtw.rtt.ceiling) == (1.0, 30.0)
+    gtw = ProGateway('127.0.0.1', timeout=0.3)
+    assert (gtw.rtt.floor, gtw.rtt.ceiling) == (0.3, 0.3), 'explicit timeout'
+
+    gtw = ProGateway('127.0.0.1')
+    for _ in range(5):
+        gtw.rtt.on_ack('gateway_get.topology', 12)
+    budgets = []
+
+    async def send_once(method, wait_result, priority, budget, **kwargs):
+        budgets.append(budget)
+        return {'result': 'ok'}
+
+    gtw.send_once = send_once
+    asyncio.run(gtw.send('gateway_get.topology'))
+    assert budgets[0] >= gtw.rtt.timeout('gateway_get.topology') > gtw.retry_deadline, 'rto is not cut by retry_deadline'
+
+
+def test_retry_idempotent():
+    from custom_components.yeelight_pro.core.scheduler import is_idempotent
+    from custom_components.yeelight_pro.core.simulator import GatewaySimulator, synthetic_nodes
+    assert is_idempotent('gateway_get.node', {'params': {'id': 1}})
+    assert is_idempotent('gateway_set.prop', {'nodes': [{'id': 1, 'set': {'p': True}}]})
+    assert not is_idempotent('gateway_set.prop', {'nodes': [{'id': 1, 'action': {'motorAdjust': {'type': 1}}}]})
+    assert not is_idempotent('gateway_set.prop', {'scenes': [{'id': 1}]})
+    from custom_components.yeelight_pro.core.device import CoverDevice
+    cover = CoverDevice({"nt": 2, "id": 1299, "type": 6})
+    assert not is_idempotent('gateway_set.prop', {'nodes': [cover.prop_node(**cover.encode({'motor': 'pause'}))]})
+
+    class Lossy(GatewaySimulator):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.ids = []
+
+        async def reply(self, writer, dat):
+            self.ids.append(dat.get('id'))
+            if len(self.ids) % 2:
+                return  # drop every first attempt
+            await super().reply(writer, dat)
+
+    async def run():
+        sim = Lossy(synthetic_nodes(1))
+        port = await sim.start()
+        gtw = ProGateway('127.0.0.1', port=port, timeout=0.1, keepalive=0)
+        await gtw.start()
+        await gtw.wait_topology()
+        sim.ids.clear()
+        gtw.retry_stats = dict.fromkeys(gtw.retry_stats, 0)
+        res = await gtw.send('gateway_set.prop', nodes=[{'id': 100000, 'nt': 2, 'set': {'p': False}}])
+        assert res and res['result'] == 'ok'
+        assert len(sim.ids) == 2 and sim.ids[0] != sim.ids[1], 'resent with a fresh id'
+        assert gtw.retry_stats['retried'] == 1
+
+        sim.ids.clear()
+        res = await gtw.send('gateway_set.prop', nodes=[{'id': 100000, 'nt': 2, 'action': {'motorAdjust': {'type': 1}}}])
+        assert res is None
+        assert len(sim.ids) == 1, 'actions are never resent'
+
+        gtw.retry_attempts = 1
+        sim.ids.clear()
+        assert await gtw.get_node(100000) is None
+        assert gtw.retry_stats['exhausted'] == 0
+        await gtw.stop()
+        await sim.stop()
+
+    asyncio.run(run())
+
+
+def test_hot_path_profiler(tmp_path):
+    from custom_components.yeelight_pro.core.device import XDevice, CoverDevice
+    from custom_components.yeelight_pro.core.profiler import HotPathProfiler
+    originals = (ProGateway.on_message, XDevice.update, CoverDevice.update)
+    profiler = HotPathProfiler(sample=2, cprofile=True)
+
+    async def run():
+        gtw = get_gateway()
+        await gtw.on_message(b'{"method": "gateway_post.topology", "nodes": [{"id": 1270, "nt": 2, "type": 2}]}\r\n')
+        await gtw.wait_topology()
+        profiler.start()
+        assert ProGateway.on_message is not originals[0]
+        for i in range(4):
+            await gtw.on_message(b'{"method": "gateway_post.prop", "nodes": [{"id": 1270, "nt": 2, "params": {"p": %s}}]}\r\n' % (b'true' if i % 2 else b'false'))
+        profiler.stop()
+
+    asyncio.run(run())
+    assert (ProGateway.on_message, XDevice.update, CoverDevice.update) == originals
+    assert HotPathProfiler.active is None
+    assert profiler.stats['ProGateway.on_message'].calls == 2
+    assert profiler.stats['XDevice.prop_changed'].calls == 2
+    path, stats_path = tmp_path / 'report.txt', tmp_path / 'report.prof'
+    profiler.save(str(path), str(stats_path))
+    assert 'XDevice.decode' in path.read_text()
+    assert stats_path.exists() or profiler.profile is None
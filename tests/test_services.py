@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.yeelight_pro import ComponentServices, DOMAIN, CONF_GATEWAYS
+from custom_components.yeelight_pro.core.device import LightDevice, RelayDevice
+from .test_gateway import Writer, get_gateway
+
+
+def add_devices(gtw, *devices):
+    for dvc in devices:
+        gtw.devices[dvc.id] = dvc
+        dvc.gateways.append(gtw)
+        for conv in dvc.converters.values():
+            if conv.domain:
+                dvc.entities[conv.attr] = SimpleNamespace(entity_id=dvc.entity_id(conv))
+
+
+def get_services(*gateways):
+    services = ComponentServices.__new__(ComponentServices)
+    services.hass = SimpleNamespace(data={DOMAIN: {CONF_GATEWAYS: {g.host: g for g in gateways}}})
+    return services
+
+
+def test_light_stream_entity_order():
+    first = LightDevice({"id": 1280, "nt": 2, "type": 2})
+    second = LightDevice({"id": 1281, "nt": 2, "type": 2})
+    relay = RelayDevice({"id": 1282, "nt": 2, "type": 6, "ch_num": 1})
+    gtw = get_gateway()
+    gtw.writer = Writer()
+    add_devices(gtw, first, second, relay)
+    services = get_services(gtw)
+    entity_ids = [
+        second.entities['light'].entity_id,
+        relay.entities['switch'].entity_id,
+        first.entities['light'].entity_id,
+    ]
+    call = SimpleNamespace(data={
+        'entity_id': entity_ids,
+        'frames': [[{'brightness': 255}, {'brightness': 128}]],
+        'fps': 30,
+    })
+    assert asyncio.run(services.async_light_stream(call)) is True
+    nodes = {n['id']: n['set'] for f in gtw.writer.frames for n in f['nodes']}
+    assert nodes == {1281: {'l': 100}, 1280: {'l': 50}}, 'list frames follow the given entities, lights only'
+
+
+def test_set_props_service():
+    lights = [LightDevice({"id": 1283 + i, "nt": 2, "type": 2}) for i in range(3)]
+    relay = RelayDevice({"id": 1286, "nt": 2, "type": 6, "ch_num": 1})
+    gtw, other = get_gateway(), get_gateway('127.0.0.2')
+    add_devices(gtw, lights[0], lights[1], relay)
+    add_devices(other, lights[2])
+    frames = []
+
+    async def set_props(nodes, method='gateway_set.prop', **kwargs):
+        frames.append((method, nodes))
+        return {'id': 1, 'nodes': [
+            {'id': n['id'], 'result': 'ok' if n['id'] != relay.id else 'error'} for n in nodes
+        ]}
+
+    async def timeout(nodes, **kwargs):
+        frames.append(('timeout', nodes))
+        return None
+
+    gtw.set_props = set_props
+    other.set_props = timeout
+    services = get_services(gtw, other)
+    call = SimpleNamespace(data={'nodes': [
+        {'entity_id': [lights[0].entities['light'].entity_id, lights[2].entities['light'].entity_id],
+         'attrs': {'light': True}},
+        {'id': lights[1].id, 'attrs': {'brightness': 255}},
+        {'id': relay.id, 'attrs': {'switch': False}},
+        {'id': lights[0].id, 'attrs': {'brightness': 128}},
+        {'id': relay.id, 'attrs': {'unknown': 1}},
+        {'entity_id': ['light.missing'], 'attrs': {'light': True}},
+    ]})
+    res = asyncio.run(services.async_set_props(call))['results']
+
+    assert len(frames) == 2, 'one frame per gateway'
+    nodes = {n['id']: n for n in frames[0][1]}
+    assert nodes[lights[0].id]['set'] == {'p': True, 'l': 50}, 'attrs of a device are merged'
+    assert nodes[lights[1].id]['set'] == {'l': 100}
+    assert frames[1] == ('timeout', [{'id': lights[2].id, 'nt': 2, 'set': {'p': True}}])
+    assert [(r['id'], r['result']) for r in res] == [
+        (lights[0].id, {'id': lights[0].id, 'result': 'ok'}),
+        (lights[2].id, None),
+        (lights[1].id, {'id': lights[1].id, 'result': 'ok'}),
+        (relay.id, {'id': relay.id, 'result': 'error'}),
+        (lights[0].id, {'id': lights[0].id, 'result': 'ok'}),
+        (relay.id, None),
+    ]
+    assert res[0]['entity_id'] == lights[0].entities['light'].entity_id
+
+
+def test_record_traffic_path(tmp_path):
+    gtw = get_gateway()
+    services = get_services(gtw)
+
+    async def executor(func, *args):
+        return func(*args)
+
+    services.hass.config = SimpleNamespace(path=lambda *args: str(tmp_path.joinpath(*args)))
+    services.hass.async_add_executor_job = executor
+    call = SimpleNamespace(data={'enabled': True, 'path': 'capture.rec.gz'})
+    assert asyncio.run(services.async_record_traffic(call)) is True
+    assert gtw.stop_recording().path == str(tmp_path / 'capture.rec.gz'), 'relative to the config directory'